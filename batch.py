@@ -0,0 +1,217 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import pakfmt
+import sections
+import unpack
+
+# 一次解出游戏目录里的全部封包，代替逐个运行 unpack.py / png.py
+# 按文件开头的标识找出所有 GswSys PACK 2.0 / DataPack5 封包，看第一个文件是不是 SCW 块区分脚本封包和图片封包
+# 全部封包的全部文件放进同一个进程池，按大小从大到小分配，最后剩下的都是小文件，各个核一直有活干
+# 输出目录下每个封包一个目录（封包在游戏目录中的相对路径去掉扩展名），内容与 unpack.py / png.py 单独解出的相同
+
+编码 = 'cp932'
+
+_config = None # 工作进程中的 (编码, 是否写段容器)
+_states = {}   # 工作进程中 封包路径 → (种类, 状态)，脚本封包的状态为 unpack 的 _worker，图片封包为 (PakExtractor, 打开的封包, 输出目录)
+
+def find_archives(game_dir):
+    """游戏目录（含子目录）下所有认识的封包，按路径排序"""
+    archives = []
+    for root, dirs, files in os.walk(game_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            try:
+                with open(path, 'rb') as f:
+                    layout = pakfmt.detect(f.read(pakfmt.MAX_HEADER))
+            except OSError:
+                continue
+            if layout is not None:
+                archives.append(path)
+    return archives
+
+def read_archive(path):
+    """
+    只读取一个封包的头部和索引表（另外看一眼第一个文件的开头），返回 (种类, 布局, [(文件名, 绝对偏移, 大小), ...])
+    种类为 'script' / 'image'，没有非空文件时为 None；文件名按 unpack.py / png.py 的方式解码
+    """
+    with open(path, 'rb') as f:
+        layout, data_offset, _, entries = pakfmt.read_index(f)
+        kind = pakfmt.archive_kind(f, layout, data_offset, entries)
+    if kind == 'script':
+        names = [unpack.decode_name(name, layout) for name, _, _ in entries]
+    else:
+        names = [name.decode(layout.name_encoding, errors='ignore') for name, _, _ in entries]
+    return kind, layout, [(name, data_offset + offset, size) for name, (_, offset, size) in zip(names, entries)]
+
+def plan_archive(path, game_dir, output_root):
+    """同 read_archive，另外返回输出目录：(种类, 布局, 输出目录, 文件列表)"""
+    kind, layout, files = read_archive(path)
+    output_dir = os.path.join(output_root, os.path.splitext(os.path.relpath(path, game_dir))[0])
+    return kind, layout, output_dir, files
+
+def _init_batch(encoding, use_sections):
+    global _config
+    _config = (encoding, use_sections)
+    _states.clear()
+
+def _state(kind, archive, layout_key, output_dir):
+    if archive in _states:
+        return _states[archive][1]
+    if kind == 'script':
+        encoding, use_sections = _config
+        unpack._init_worker(archive, layout_key, output_dir, encoding, False, use_sections)
+        state = unpack._worker
+    else:
+        import png # 需要 numpy 和 PIL，只有图片封包才用到
+        extractor = png.PakExtractor(archive)
+        extractor.layout = pakfmt.LAYOUTS[layout_key]
+        state = (extractor, open(archive, 'rb'), Path(output_dir))
+    _states[archive] = (kind, state)
+    return state
+
+def extract_task(task):
+    """
+    在当前工作进程中解出一个文件，task 为 (种类, 封包路径, 布局, 输出目录, (文件名, 绝对偏移, 大小))
+    脚本返回 unpack.extract_entry 的结果，图片返回 PakExtractor.extract_entry 的结果
+    打开封包等准备工作出错时这个文件算作失败，不影响其他封包
+    """
+    kind, archive, layout_key, output_dir, entry = task
+    name, offset, size = entry
+    try:
+        state = _state(kind, archive, layout_key, output_dir)
+    except Exception as e:
+        if kind == 'script':
+            return [f"错误：处理文件 '{name}' (偏移: 0x{offset:X}) 时发生错误：{e}"], None, None
+        return 'fail', f"✗ {e}"
+    if kind == 'script':
+        unpack._worker = state
+        return unpack.extract_entry(entry)
+    extractor, f, output_path = state
+    return extractor.extract_entry(f, {'name': name, 'offset': offset, 'size': size}, output_path)
+
+def _close_batch():
+    for kind, state in _states.values():
+        if kind == 'script':
+            unpack._worker = state
+            unpack._close_worker()
+        else:
+            state[1].close()
+    _states.clear()
+
+def extract_game(game_dir, output_root, jobs=None, use_sections=False):
+    """
+    解出 game_dir 下的全部封包，所有文件共用一个进程池
+    use_sections 同 unpack.py 的 --sections，只影响脚本封包
+    返回出错的封包数：读不出索引表的，和有文件解出失败的（全部失败或部分失败）
+    """
+    archives = []
+    failed = 0
+    for path in find_archives(game_dir):
+        try:
+            kind, layout, output_dir, files = plan_archive(path, game_dir, output_root)
+        except ValueError as e:
+            print(f"错误：{path}：{e}")
+            failed += 1
+            continue
+        if kind is None:
+            print(f"{path}：没有文件，跳过")
+            continue
+        print(f"{path}：{layout.name}，{'脚本' if kind == 'script' else '图片'}，{len(files)} 个文件 → {output_dir}")
+        archives.append((path, kind, layout, output_dir, files))
+    if any(kind == 'image' for _, kind, _, _, _ in archives):
+        try:
+            import png # 需要 numpy 和 PIL，没有安装时跳过图片封包，脚本封包照常解出
+        except ImportError as e:
+            for path, kind, _, _, _ in archives:
+                if kind == 'image':
+                    print(f"{path}：需要 numpy 和 PIL 才能解出图片（{e}），跳过")
+            archives = [archive for archive in archives if archive[1] != 'image']
+    if not archives:
+        print(f"错误：'{game_dir}' 中没有找到能解出的封包")
+        return failed + 1
+    for _, kind, _, output_dir, files in archives:
+        os.makedirs(output_dir, exist_ok=True)
+        if kind == 'script':
+            for message in sections.remove_stale(output_dir, [name for name, _, _ in files], use_sections):
+                print(message)
+
+    # 大的文件先分出去，最后剩下的都是小文件，不会有一个核在做最大的文件而其他核空等
+    tasks = [((kind, path, layout.key, output_dir, entry), n, position)
+             for n, (path, kind, layout, output_dir, files) in enumerate(archives)
+             for position, entry in enumerate(files)]
+    tasks.sort(key=lambda task: -task[0][4][2])
+    counts = [{'ok': 0, 'empty': 0, 'fail': 0} for _ in archives]
+    container_entries = [[] for _ in archives]
+    jobs = jobs or os.cpu_count() or 1
+    print(f"共 {len(archives)} 个封包、{len(tasks)} 个文件，{jobs} 个进程")
+
+    def report(results):
+        for i, ((task, n, position), result) in enumerate(zip(tasks, results)):
+            kind, path, _, _, (name, _, _) = task
+            if kind == 'script':
+                messages, _, spans = result
+                print(f"[{i+1}/{len(tasks)}] {path}：{name}")
+                for message in messages:
+                    print(message)
+                counts[n]['fail' if any(message.startswith('错误') for message in messages) else 'ok'] += 1
+                if spans is not None:
+                    filename, part_path, entry_spans = spans
+                    container_entries[n].append((position, (filename, part_path if entry_spans else None, entry_spans)))
+            else:
+                status, message = result
+                print(f"[{i+1}/{len(tasks)}] {path}：{name} ... {message}")
+                counts[n][status] += 1
+
+    initargs = (编码, use_sections)
+    if jobs == 1 or len(tasks) < 2:
+        _init_batch(*initargs)
+        try:
+            report(map(extract_task, (task for task, _, _ in tasks)))
+        finally:
+            _close_batch()
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch, initargs=initargs) as executor:
+            report(executor.map(extract_task, [task for task, _, _ in tasks], chunksize=max(1, len(tasks) // (jobs * 4))))
+
+    print("--- 汇总 ---")
+    for n, (path, kind, layout, output_dir, files) in enumerate(archives):
+        if container_entries[n]:
+            entries = [entry for _, entry in sorted(container_entries[n], key=lambda item: item[0])]
+            sections.write_container(sections.container_path(output_dir), entries)
+        count = counts[n]
+        empty = f"，{count['empty']} 个没有图像" if count['empty'] else ''
+        status = ''
+        if count['fail']:
+            failed += 1
+            status = '全部失败：' if count['fail'] == len(files) else '部分失败：'
+        print(f"{status}{path}：{count['ok']} 成功，{count['fail']} 失败{empty} → {output_dir}")
+    if failed:
+        print(f"{failed} 个封包有错误")
+    return failed
+
+def main():
+    global 编码
+    parser = argparse.ArgumentParser(description="解出游戏目录里的全部封包（自动识别 PACK 2.0 / DataPack5、脚本 / 图片），所有文件共用一个进程池。")
+    parser.add_argument("game_dir", help="游戏目录，子目录中的封包也会解出。")
+    parser.add_argument("output_dir", help="输出目录，每个封包一个子目录。")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数（默认: CPU 核心数）。")
+    parser.add_argument("--sections", action='store_true', help="脚本封包的二进制段写进 sections.bin（同 unpack.py --sections）。")
+    parser.add_argument("--encoding", default=编码, help=f"脚本文本的编码（默认: {编码}）。")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.game_dir):
+        print(f"错误：未找到目录 '{args.game_dir}'")
+        sys.exit(1)
+    编码 = args.encoding
+    failed = extract_game(args.game_dir, args.output_dir, args.jobs, args.sections)
+    print("处理完成")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import random
+import struct
+import argparse
+import platform
+import tempfile
+import contextlib
+
+import pack
+import pakfmt
+import unpack
+import tojson
+import search
+import validate
+import name_edit
+
+# 性能基准：生成合成的 GswSys PACK 2.0 / DataPack5 封包，测量压缩、解压、打包、解包、图片提取和文本工具的耗时
+# 每项重复 --repeat 次取最短时间，结果写成 JSON；与保存的基线比较，任何一项变慢超过 --threshold 时返回 1
+#
+# 合成数据：
+#   脚本：与 unpack.py 的输出目录相同（每个脚本一个目录放 table1/table3/opcode/str2.bin，外加一个txt），
+#         opcode 由一组固定的指令模板拼成，文本由常用汉字组成，部分句子重复、部分带 #F【名字】#F
+#   图片：PACK 2.0 和 DataPack5 两种图片封包（都由 png.py 提取），按 --bpp-mix 的比例混合 8/24/32 位
+
+编码 = 'cp936'
+BASELINE_FILE = 'bench_baseline.json'
+DEFAULT_THRESHOLD = 0.2 # 比基线慢 20% 以上视为性能下降
+MIN_SLOWDOWN = 0.005    # 慢得不到 5 毫秒的不算，太短的项目计时误差比例很大
+GROUPS = ('compress', 'decompress', 'pack', 'unpack', 'images', 'text')
+CHARS = ('的一是在不了有和人这中大为上个我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说'
+         '产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把')
+NAMES = ('【女Ａ】', '【男Ｂ】', '【少女】', '【老师】', '【店长】', '【？？？】')
+
+def load_png():
+    """png.py 依赖 numpy 和 PIL，没有安装时返回 None，图片提取一项跳过"""
+    try:
+        import png
+    except ImportError:
+        return None
+    return png
+
+# --- 合成数据 ---
+
+def make_line(rng, length):
+    line = ''.join(rng.choice(CHARS) for _ in range(max(1, int(rng.gauss(length, length / 3)))))
+    if rng.random() < 0.3:
+        line = f'#F{rng.choice(NAMES)}#F\n「{line}」'
+    return line
+
+def make_opcode(rng, size, string_count):
+    """由固定的指令模板拼成：2 字节指令号 + 若干 4 字节参数，参数多为小整数和字符串编号"""
+    templates = [(rng.randrange(0x200), rng.randrange(4)) for _ in range(24)]
+    output = bytearray()
+    while len(output) < size:
+        code, operands = rng.choice(templates)
+        output += struct.pack('<H', code)
+        for _ in range(operands):
+            output += struct.pack('<I', rng.randrange(max(1, string_count)) if rng.random() < 0.5 else rng.randrange(16))
+    return bytes(output[:size])
+
+def make_table(rng, size):
+    """16 字节一项的表，大小向下取整到 16 的倍数"""
+    return b''.join(struct.pack('<IIII', i, rng.randrange(0x10000), rng.randrange(8), 0) for i in range(size // 16))
+
+def write_txt(path, 描述文本, texts):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'；；{描述文本}\n；；{len(texts)}\n\n')
+        for text in texts:
+            f.write(f'\n{name_edit.BLACK_DELIMITER}\n{text}')
+            f.write(f'\n{name_edit.WHITE_DELIMITER}\n{text}')
+
+def make_scripts(directory, config, rng):
+    """
+    生成 unpack.py 格式的解包目录：每个脚本大约 script_size 字节，其中 text_ratio 是文本，其余是 opcode 和各个表
+    返回全部脚本原始数据的总字节数
+    """
+    os.makedirs(directory, exist_ok=True)
+    common = [make_line(rng, config.string_length) for _ in range(16)]
+    total = 0
+    for i in range(config.scripts):
+        item = f'sc{i:05d}'
+        item_dir = os.path.join(directory, item)
+        os.makedirs(item_dir, exist_ok=True)
+
+        text_size = int(config.script_size * config.text_ratio)
+        string_count = max(1, text_size // (config.string_length * 2 + 17))
+        texts = [rng.choice(common) if rng.random() < 0.1 else make_line(rng, config.string_length)
+                 for _ in range(string_count)]
+        write_txt(os.path.join(directory, f'{item}.txt'), item, texts)
+
+        binary_size = max(0, config.script_size - text_size)
+        sections = {
+            'table1.bin': make_table(rng, binary_size // 10),
+            'table3.bin': make_table(rng, binary_size // 20),
+            'str2.bin': b''.join(f'label_{rng.randrange(1000):03d}'.encode() + b'\x00' for _ in range(binary_size // 200)),
+        }
+        sections['opcode.bin'] = make_opcode(rng, binary_size - sum(map(len, sections.values())), string_count)
+        for filename, data in sections.items():
+            with open(os.path.join(item_dir, filename), 'wb') as f:
+                f.write(data)
+        total += sum(map(len, sections.values())) + sum(len(t.encode(编码)) + 1 for t in texts) + string_count * 16
+    return total
+
+def parse_bpp_mix(text):
+    """'8:2,24:1,32:1' → [(8, 2), (24, 1), (32, 1)]"""
+    mix = []
+    for part in text.split(','):
+        bpp, _, weight = part.partition(':')
+        if int(bpp) not in (8, 24, 32):
+            raise argparse.ArgumentTypeError(f'不支持的位深：{bpp}')
+        mix.append((int(bpp), int(weight or 1)))
+    return mix
+
+def make_pixels(rng, w, h, bpp):
+    """渐变加少量噪点，压缩率接近普通 CG；8 位图前面是 256 色 BGRA 调色板"""
+    channels = bpp // 8
+    rows = []
+    for y in range(h):
+        if rng.random() < 0.1:
+            rows.append(rng.randbytes(w * channels))
+        else:
+            rows.append(bytes(((x // channels) + y * 3 + (x % channels) * 40) & 0xff for x in range(w * channels)))
+    pixels = b''.join(rows)
+    if bpp == 8:
+        pixels = rng.randbytes(1024) + pixels
+    return pixels
+
+def make_images(config, rng):
+    bpps = [bpp for bpp, weight in config.bpp_mix for _ in range(weight)]
+    images = []
+    for i in range(config.images):
+        bpp = bpps[i % len(bpps)]
+        w = h = config.image_size
+        images.append((f'cg{i:04d}', w, h, bpp, make_pixels(rng, w, h, bpp)))
+    return images
+
+def build_gsw_image_pak(path, images):
+    """PACK 2.0 图片封包：每项 40 字节头部（压缩大小、宽、高、位深）+ LZSS 数据，索引异或加密"""
+    index = bytearray()
+    data = bytearray()
+    for name, w, h, bpp, pixels in images:
+        compressed = pack.compress(pixels, 'fast', xor=False)
+        block = struct.pack('<10I', len(compressed), 0, 0, 0, w, h, bpp, 0, 0, 0) + compressed
+        index += pakfmt.index_entry(pakfmt.GSWSYS, name.encode(编码), len(data), len(block))
+        data += block
+    compressed_index = pack.compress(index, 'fast')
+    with open(path, 'wb') as f:
+        f.write(pakfmt.archive_header(pakfmt.GSWSYS, compressed_index, len(images)) + data)
+
+def build_lilith_image_pak(path, images):
+    """DataPack5 图片封包：每项一个 0x74 字节头部的图片块，4 字节对齐，索引不加密"""
+    index = bytearray()
+    data = bytearray()
+    for name, w, h, bpp, pixels in images:
+        compressed = pack.compress(pixels, 'fast', xor=False)
+        block = struct.pack('<29I', 0, len(compressed), len(pixels), 0x74, 0, w, h, bpp, *([0] * 21)) + compressed
+        block += bytes(-len(block) % 4)
+        index += pakfmt.index_entry(pakfmt.DATAPACK5, name.encode(编码), len(data), len(block))
+        data += block
+    compressed_index = pack.compress(index, 'fast', xor=False)
+    with open(path, 'wb') as f:
+        f.write(pakfmt.archive_header(pakfmt.DATAPACK5, compressed_index, len(images)) + data)
+
+def generate(directory, config):
+    """生成全部合成数据，返回 {名称: 路径或大小}"""
+    rng = random.Random(config.seed)
+    corpus = {'scripts': os.path.join(directory, 'scr'), 'gsw_images': os.path.join(directory, 'cg.pak'),
+              'lilith_images': os.path.join(directory, 'cg_Lilith.pak')}
+    corpus['script_bytes'] = make_scripts(corpus['scripts'], config, rng)
+    images = make_images(config, rng)
+    corpus['image_bytes'] = sum(len(image[4]) for image in images)
+    build_gsw_image_pak(corpus['gsw_images'], images)
+    build_lilith_image_pak(corpus['lilith_images'], images)
+    return corpus
+
+# --- 计时 ---
+
+def measure(func, repeat, setup=None):
+    """运行 repeat 次取最短时间，setup 不计时；被测函数的输出全部丢弃"""
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def result(seconds, size=None):
+    entry = {'seconds': round(seconds, 6)}
+    if size:
+        entry['bytes'] = size
+        entry['mb_s'] = round(size / seconds / (1 << 20), 3) if seconds else None
+    return entry
+
+def remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def compression_sample(corpus, size):
+    """把合成脚本的各段拼起来，取前 size 字节作为压缩测试数据"""
+    sample = bytearray()
+    for root, _, files in sorted(os.walk(corpus['scripts'])):
+        for filename in sorted(files):
+            with open(os.path.join(root, filename), 'rb') as f:
+                data = f.read()
+            sample += data.decode('utf-8').encode(编码, errors='ignore') if filename.endswith('.txt') else data
+            if len(sample) >= size:
+                return bytes(sample[:size])
+    return bytes(sample)
+
+def run_benchmarks(corpus, directory, config):
+    results = {}
+    only = set(config.only)
+    repeat = config.repeat
+
+    if 'compress' in only or 'decompress' in only:
+        sample = compression_sample(corpus, config.sample_size)
+    if 'compress' in only:
+        for level in config.levels:
+            results[f'compress.{level}'] = result(measure(lambda: pack.compress(sample, level), repeat), len(sample))
+
+    if 'decompress' in only:
+        compressed = bytes(pack.compress(sample, 'normal'))
+        results['decompress.unpack'] = result(measure(
+            lambda: unpack.LzDecompressor(unpack.xor_decrypt(compressed)).decompress(), repeat), len(sample))
+        # 图片块不异或，直接解压
+        plain = bytes(pack.compress(sample, 'normal', xor=False))
+        results['decompress.png'] = result(measure(lambda: pakfmt.decompress(plain, len(plain)), repeat), len(sample))
+
+    gsw_pak = os.path.join(directory, 'scr.pak')
+    lilith_pak = os.path.join(directory, 'scr_Lilith.pak')
+    if 'pack' in only or 'unpack' in only:
+        pack.编码 = 编码
+        pack.work_dir = corpus['scripts']
+        pack.压缩级别 = config.level
+    def pack_as(layout, out):
+        pack.格式, pack.out_pack = layout, out
+        pack.pack()
+    if 'pack' in only:
+        results['pack.gswsys'] = result(measure(lambda: pack_as(pakfmt.GSWSYS, gsw_pak), repeat), corpus['script_bytes'])
+        results['pack.datapack5'] = result(measure(lambda: pack_as(pakfmt.DATAPACK5, lilith_pak), repeat),
+                                           corpus['script_bytes'])
+
+    if 'unpack' in only:
+        out = os.path.join(directory, 'unpacked')
+        for key, layout, pak in (('unpack.gswsys', pakfmt.GSWSYS, gsw_pak), ('unpack.datapack5', pakfmt.DATAPACK5, lilith_pak)):
+            if not os.path.exists(pak):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    pack_as(layout, pak)
+            results[key] = result(measure(lambda: unpack.extract_pak(pak, out, jobs=config.jobs, encoding=编码), repeat,
+                                          lambda: remove(out)), corpus['script_bytes'])
+
+    if 'images' in only:
+        png = load_png()
+        for key, pak in (('images.gswsys', corpus['gsw_images']), ('images.datapack5', corpus['lilith_images'])):
+            if png is None:
+                results[key] = {'skipped': '需要 numpy 和 PIL'}
+                continue
+            out = os.path.join(directory, key)
+            results[key] = result(measure(lambda: png.PakExtractor(pak).extract_all(out), repeat,
+                                          lambda: remove(out)), corpus['image_bytes'])
+
+    if 'text' in only:
+        scripts = corpus['scripts']
+        json_dir = os.path.join(directory, 'json')
+        results['text.tojson'] = result(measure(lambda: tojson.convert_directory(scripts, json_dir, jobs=config.jobs),
+                                                repeat, lambda: remove(json_dir)))
+        results['text.validate'] = result(measure(lambda: validate.validate(scripts, 编码, jobs=config.jobs), repeat))
+
+        index_path = os.path.join(directory, 'search.db')
+        def build_index():
+            conn = search.open_index(index_path)
+            search.update_index(conn, scripts)
+            conn.close()
+        results['text.search_index'] = result(measure(build_index, repeat,
+                                                      lambda: [remove(index_path + s) for s in ('', '-wal', '-shm')]))
+
+        # name_edit 把 names.txt 和缓存写在当前目录
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            results['text.name_edit'] = result(measure(lambda: name_edit.extract_names(scripts, config.jobs), repeat,
+                                                       lambda: [remove(name_edit.NAMES_FILE), remove(name_edit.CACHE_FILE)]))
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+# --- 基线比较 ---
+
+def compare(results, baseline, threshold):
+    """返回 [(名称, 本次秒数, 基线秒数, 变化比例)]，以及变慢超过阈值的名称列表"""
+    rows, slower = [], []
+    for name, entry in results.items():
+        base = baseline.get('results', {}).get(name)
+        if 'seconds' not in entry or not base or not base.get('seconds'):
+            continue
+        change = entry['seconds'] / base['seconds'] - 1
+        rows.append((name, entry['seconds'], base['seconds'], change))
+        if change > threshold and entry['seconds'] - base['seconds'] > MIN_SLOWDOWN:
+            slower.append(name)
+    return rows, slower
+
+def print_results(results, rows):
+    changes = {name: (base, change) for name, _, base, change in rows}
+    print(f"{'项目':<20}{'秒':>10}{'MB/s':>10}{'基线':>10}{'变化':>9}")
+    for name, entry in results.items():
+        if 'skipped' in entry:
+            print(f"{name:<20}{'跳过：' + entry['skipped']:>20}")
+            continue
+        mb_s = f"{entry['mb_s']:.2f}" if entry.get('mb_s') else '-'
+        line = f"{name:<20}{entry['seconds']:>10.3f}{mb_s:>10}"
+        if name in changes:
+            base, change = changes[name]
+            line += f"{base:>10.3f}{change:>+9.1%}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成封包并测量打包、解包、压缩和文本工具的速度，与基线比较。")
+    parser.add_argument('--scripts', type=int, default=64, help='合成脚本数（默认: 64）')
+    parser.add_argument('--script-size', type=int, default=8192, help='每个脚本的原始大小，字节（默认: 8192）')
+    parser.add_argument('--text-ratio', type=float, default=0.4, help='脚本中文本所占比例，其余为 opcode 和各个表（默认: 0.4）')
+    parser.add_argument('--string-length', type=int, default=24, help='每句平均字数（默认: 24）')
+    parser.add_argument('--images', type=int, default=12, help='合成图片数（默认: 12）')
+    parser.add_argument('--image-size', type=int, default=128, help='图片边长（默认: 128）')
+    parser.add_argument('--bpp-mix', type=parse_bpp_mix, default='8:1,24:1,32:1', help='位深及比例（默认: 8:1,24:1,32:1）')
+    parser.add_argument('--sample-size', type=int, default=0x10000, help='压缩/解压测试数据的大小（默认: 65536）')
+    parser.add_argument('--levels', default='store,fast,normal,max', help='要测的压缩级别（默认: store,fast,normal,max）')
+    parser.add_argument('-l', '--level', choices=pack.LEVELS, default=pack.压缩级别, help=f'打包使用的压缩级别（默认: {pack.压缩级别}）')
+    parser.add_argument('--only', default=','.join(GROUPS), help=f'只测这些项目（默认: {",".join(GROUPS)}）')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='解包和文本工具的并行进程数（默认: 1，便于和基线比较）')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最短时间（默认: 3）')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子（默认: 1）')
+    parser.add_argument('--keep', help='把合成数据和输出保存在这个目录，不删除')
+    parser.add_argument('--generate-only', action='store_true', help='只生成合成数据（配合 --keep），不计时')
+    parser.add_argument('-o', '--output', help='把结果写成 JSON 文件')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help=f'基线文件（默认: {BASELINE_FILE}）')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f'变慢超过这个比例时失败（默认: {DEFAULT_THRESHOLD}）')
+    args = parser.parse_args()
+
+    args.levels = [level for level in args.levels.split(',') if level]
+    args.only = [group for group in args.only.split(',') if group]
+    for level in args.levels:
+        if level not in pack.LEVELS or level == 'auto':
+            parser.error(f'未知的压缩级别：{level}')
+    for group in args.only:
+        if group not in GROUPS:
+            parser.error(f'未知的项目：{group}')
+
+    config = {key: getattr(args, key) for key in ('scripts', 'script_size', 'text_ratio', 'string_length', 'images',
+                                                  'image_size', 'bpp_mix', 'sample_size', 'level', 'jobs', 'seed')}
+
+    with contextlib.ExitStack() as stack:
+        if args.keep:
+            directory = args.keep
+            os.makedirs(directory, exist_ok=True)
+        else:
+            directory = stack.enter_context(tempfile.TemporaryDirectory(prefix='yami_bench_'))
+
+        print('正在生成合成数据...')
+        corpus = generate(directory, args)
+        print(f"脚本 {args.scripts} 个，共 {corpus['script_bytes']} 字节；图片 {args.images} 张，共 {corpus['image_bytes']} 字节")
+        if args.generate_only:
+            print(f'已生成到 {directory}')
+            return
+
+        results = run_benchmarks(corpus, directory, args)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'config': config,
+        'results': results,
+    }
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    rows, slower = compare(results, baseline, args.threshold) if baseline else ([], [])
+    print_results(results, rows)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'已保存基线 {args.baseline}')
+        return
+
+    if baseline is None:
+        print(f'没有基线文件 {args.baseline}，用 --save-baseline 保存一份')
+        return
+    if baseline.get('config') != json.loads(json.dumps(config)):
+        print('警告：本次配置与基线不同，比较结果仅供参考')
+    if slower:
+        print(f"比基线慢 {args.threshold:.0%} 以上：{', '.join(slower)}")
+        sys.exit(1)
+    print('没有发现性能下降')
+
+if __name__ == "__main__":
+    main()
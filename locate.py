@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+import pakfmt
+import batch
+
+# 游戏目录里全部封包的文件索引，保存在 SQLite 数据库里，不用逐个解包就能查到某个文件在哪个封包里
+# 只读取每个封包的头部和索引表（PACK 2.0 每项 0x28 字节，DataPack5 每项 0x68 字节，见 pakfmt.py）
+# archives: 已索引封包的修改时间、大小、格式和种类（script / image），用于增量更新
+# entries: 文件名 → 所在封包、绝对偏移、大小
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS archives (
+    archive TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    kind TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT NOT NULL,
+    archive TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name);
+CREATE INDEX IF NOT EXISTS entries_archive ON entries (archive);
+'''
+
+DEFAULT_INDEX = 'locate.db'
+WILDCARDS = '*?['
+
+def open_index(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def list_files(directory):
+    """目录下所有文件，返回 {封包名: 路径}，封包名为相对路径"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, directory).replace(os.sep, '/')] = path
+    return files
+
+def _remove_archive(conn, archive):
+    conn.execute('DELETE FROM entries WHERE archive = ?', (archive,))
+    conn.execute('DELETE FROM archives WHERE archive = ?', (archive,))
+
+def update_index(conn, directory):
+    """
+    增量更新索引：只重新读取修改时间或大小变化了的封包，删除已经不存在的封包
+    不是封包的文件每次都要看一眼开头，只读 pakfmt.MAX_HEADER 字节
+    返回 (更新的封包数, 删除的封包数)
+    """
+    files = list_files(directory)
+    indexed = {archive: (mtime, size) for archive, mtime, size in conn.execute('SELECT archive, mtime, size FROM archives')}
+    updated = removed = 0
+
+    with conn:
+        for archive, path in sorted(files.items()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if indexed.get(archive) == (st.st_mtime_ns, st.st_size):
+                continue
+            if archive in indexed:
+                # 改过的封包先删掉旧的项；已经不是封包或读不出来时算作移除
+                _remove_archive(conn, archive)
+                removed += 1
+            try:
+                with open(path, 'rb') as f:
+                    if pakfmt.detect(f.read(pakfmt.MAX_HEADER)) is None:
+                        continue
+                kind, layout, entries = batch.read_archive(path)
+            except (OSError, ValueError) as e:
+                print(f'警告：{path} 读取失败，跳过：{e}')
+                continue
+            if archive in indexed:
+                removed -= 1
+            conn.executemany('INSERT INTO entries (name, archive, offset, size) VALUES (?, ?, ?, ?)',
+                             ((name, archive, offset, size) for name, offset, size in entries))
+            conn.execute('INSERT INTO archives (archive, mtime, size, format, kind) VALUES (?, ?, ?, ?, ?)',
+                         (archive, st.st_mtime_ns, st.st_size, layout.key, kind))
+            updated += 1
+
+        for archive in indexed.keys() - files.keys():
+            _remove_archive(conn, archive)
+            removed += 1
+
+    return updated, removed
+
+def lookup(conn, pattern):
+    """
+    查找文件，返回 [(文件名, 封包, 绝对偏移, 大小, 种类), ...]
+    pattern 中有 * ? [ 时按通配符匹配（区分大小写），否则按完整文件名查找
+    """
+    op = 'GLOB' if any(c in pattern for c in WILDCARDS) else '='
+    return conn.execute('SELECT e.name, e.archive, e.offset, e.size, a.kind FROM entries e '
+                        f'JOIN archives a ON a.archive = e.archive WHERE e.name {op} ? '
+                        'ORDER BY e.archive, e.name', (pattern,)).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="查找游戏目录中某个文件在哪个封包里（只读取各封包的索引表）。")
+    parser.add_argument('directory', help='游戏目录。')
+    parser.add_argument('name', nargs='?', help='要查找的文件名，可以用 * ? 通配符；不指定时只更新索引。')
+    parser.add_argument('-d', '--index', default=DEFAULT_INDEX, help=f'索引数据库路径（默认: {DEFAULT_INDEX}）。')
+    parser.add_argument('--no-update', action='store_true', help='查找前不检查封包变化。')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"错误: 目录不存在: {args.directory}")
+        sys.exit(1)
+
+    conn = open_index(args.index)
+    if not args.no_update or args.name is None:
+        start = time.perf_counter()
+        updated, removed = update_index(conn, args.directory)
+        if updated or removed:
+            print(f'索引已更新：{updated} 个封包重新读取，{removed} 个封包移除（{time.perf_counter() - start:.2f} 秒）')
+
+    if args.name is not None:
+        start = time.perf_counter()
+        rows = lookup(conn, args.name)
+        elapsed = (time.perf_counter() - start) * 1000
+        for name, archive, offset, size, kind in rows:
+            print(f'{name}：{archive}（{kind or "空"}）偏移 0x{offset:X}，{size} 字节')
+        print(f'共 {len(rows)} 条（{elapsed:.1f} 毫秒）')
+    conn.close()
+
+if __name__ == "__main__":
+    main()
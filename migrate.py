@@ -0,0 +1,141 @@
+import os
+import sys
+import argparse
+
+from tojson import txt_to_entries, entries_to_txt
+
+# 新版本游戏重新解包后，把旧译文搬到新提取的txt里
+# 匹配顺序：
+#   same    同一脚本、同一序号、原文相同
+#   moved   同一脚本中出现过相同原文（有多处时优先选前后两项原文也相同的一处）
+#   exact   其他脚本中出现过相同原文（取最常用的译文）
+#   changed 原文变了，但同一脚本中前后两项的原文都对得上，沿用旧译文并标记需要检查
+#   new     找不到对应，保留原文并标记
+FLAGGED = ('changed', 'new')
+REPORT_FILE = 'migrate_report.txt'
+
+def load_corpus(directory):
+    """读取目录下所有txt，返回 {脚本名: (文件头, 条目列表)}，脚本名为去掉 .txt 的相对路径"""
+    corpus = {}
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.endswith('.txt'):
+                path = os.path.join(root, filename)
+                script = os.path.relpath(path, directory)[:-4]
+                try:
+                    corpus[script] = txt_to_entries(path)
+                except Exception as e:
+                    print(f'警告：{path} 解析失败，跳过：{e}')
+    return corpus
+
+def _neighbours(entries, i):
+    prev_src = entries[i - 1]['original'] if i > 0 else None
+    next_src = entries[i + 1]['original'] if i + 1 < len(entries) else None
+    return prev_src, next_src
+
+def build_old_index(old_corpus):
+    """
+    对旧译文建立哈希索引，全部是一次遍历
+    by_source: 原文 → {译文: 次数}
+    by_script: (脚本, 原文) → 第一次出现的序号
+    by_script_context: (脚本, 原文, 前一项原文, 后一项原文) → 序号
+    by_context: (脚本, 前一项原文, 后一项原文) → 序号
+    """
+    by_source, by_script, by_script_context, by_context = {}, {}, {}, {}
+    for script, (_, entries) in old_corpus.items():
+        for i, entry in enumerate(entries):
+            source = entry['original']
+            neighbours = _neighbours(entries, i)
+            counts = by_source.setdefault(source, {})
+            counts[entry['translation']] = counts.get(entry['translation'], 0) + 1
+            by_script.setdefault((script, source), i)
+            by_script_context.setdefault((script, source) + neighbours, i)
+            by_context.setdefault((script,) + neighbours, i)
+    return by_source, by_script, by_script_context, by_context
+
+def migrate_script(script, entries, old_corpus, old_index):
+    """给一个新脚本的每一项找旧译文，返回 (新条目列表, [(序号, 状态, 旧原文), ...])"""
+    by_source, by_script, by_script_context, by_context = old_index
+    old_entries = old_corpus[script][1] if script in old_corpus else []
+    result, statuses = [], []
+
+    for i, entry in enumerate(entries):
+        source = entry['original']
+        neighbours = _neighbours(entries, i)
+        translation, status, old_source = source, 'new', None
+
+        if i < len(old_entries) and old_entries[i]['original'] == source:
+            translation, status = old_entries[i]['translation'], 'same'
+        elif (script, source) in by_script:
+            j = by_script_context.get((script, source) + neighbours, by_script[(script, source)])
+            translation, status = old_entries[j]['translation'], 'moved'
+        elif source in by_source:
+            counts = by_source[source]
+            translation, status = max(counts, key=counts.get), 'exact'
+        elif (script,) + neighbours in by_context and None not in neighbours:
+            old = old_entries[by_context[(script,) + neighbours]]
+            translation, status, old_source = old['translation'], 'changed', old['original']
+
+        result.append({'index': entry['index'], 'original': source, 'translation': translation})
+        statuses.append((entry['index'], status, old_source))
+
+    return result, statuses
+
+def migrate(old_dir, new_dir, output_dir=None):
+    """
+    把 old_dir 中的译文搬到 new_dir 新提取的txt里，写到 output_dir（默认直接覆盖 new_dir 中的txt）
+    返回 ({状态: 数量}, [(脚本, 序号, 状态, 原文, 旧原文), ...] 需要检查的项)
+    """
+    output_dir = output_dir or new_dir
+    old_corpus = load_corpus(old_dir)
+    new_corpus = load_corpus(new_dir)
+    old_index = build_old_index(old_corpus)
+
+    counts = {'same': 0, 'moved': 0, 'exact': 0, 'changed': 0, 'new': 0}
+    flagged = []
+    for script, (header, entries) in new_corpus.items():
+        result, statuses = migrate_script(script, entries, old_corpus, old_index)
+        # 描述文本也可能翻译过，旧版本有这个脚本时沿用旧的描述文本，文本数用新的
+        if script in old_corpus:
+            old_header = old_corpus[script][0].split('\n')
+            header = '\n'.join(old_header[:1] + header.split('\n')[1:])
+        output_path = os.path.join(output_dir, script + '.txt')
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        entries_to_txt(header, result, output_path)
+
+        for (index, status, old_source), entry in zip(statuses, result):
+            counts[status] += 1
+            if status in FLAGGED:
+                flagged.append((script, index, status, entry['original'], old_source))
+
+    return counts, flagged
+
+def write_report(flagged, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for script, index, status, source, old_source in flagged:
+            if status == 'changed':
+                f.write(f'{script} {index} 修改：{old_source} → {source}\n')
+            else:
+                f.write(f'{script} {index} 新增：{source}\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="把旧版本的译文搬到新版本解包出的txt里。")
+    parser.add_argument('old_dir', help='旧版本已翻译的txt目录。')
+    parser.add_argument('new_dir', help='新版本 unpack.py 的输出目录。')
+    parser.add_argument('-o', '--output', help='输出目录（默认: 直接覆盖 new_dir 中的txt）。')
+    parser.add_argument('-r', '--report', default=REPORT_FILE, help=f'需要检查的项写到这个文件（默认: {REPORT_FILE}）。')
+    args = parser.parse_args()
+
+    for directory in (args.old_dir, args.new_dir):
+        if not os.path.isdir(directory):
+            print(f"错误: 目录不存在: {directory}")
+            sys.exit(1)
+
+    counts, flagged = migrate(args.old_dir, args.new_dir, args.output)
+    write_report(flagged, args.report)
+    print(f"沿用 {counts['same'] + counts['moved'] + counts['exact']} 项"
+          f"（原位 {counts['same']}，同脚本移动 {counts['moved']}，其他脚本 {counts['exact']}）")
+    print(f"修改 {counts['changed']} 项，新增 {counts['new']} 项，已写入 '{args.report}'")
+
+if __name__ == "__main__":
+    main()
@@ -1,213 +1,395 @@
-import re
-import os
-import sys
-import argparse
-
-# 定义分隔符
-BLACK_DELIMITER = '■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■' 
-WHITE_DELIMITER = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□' 
-NAME_PATTERN = re.compile(r'#F(.*?)#F') # 匹配 #F...#F 中的内容
-NAMES_FILE = 'names.txt' # 存放所有人名列表和译文的文件
-
-def extract_names(directory):
-    """
-    从指定目录下的txt文件原文部分提取所有不重复人名，并写入names.txt文件。
-    names.txt 使用黑白方块格式，原文和译文部分都只有提取到的名字（不带#F）。
-    """
-    print(f"正在从文件提取人名到 '{NAMES_FILE}'...")
-    all_unique_names = set()
-
-    for root, _, files in os.walk(directory):
-        for filename in files:
-            # 忽略 names.txt 文件本身
-            if filename.endswith('.txt') and filename != NAMES_FILE:
-                filepath = os.path.join(root, filename)
-                # print(f"处理文件: {filepath}") # 调试用，正式运行时可注释
-
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-
-                    # 根据黑色方块分割成块
-                    blocks = re.split(BLACK_DELIMITER, content)
-                    
-                    # 遍历每个块，提取原文中的人名（不带#F）
-                    for block in blocks:
-                        parts = block.split(WHITE_DELIMITER, 1)
-                        if len(parts) == 2:
-                            original_text = parts[0]
-                            matches = NAME_PATTERN.findall(original_text)
-                            for name in matches:
-                                all_unique_names.add(name) # 提取到的名字本身，不带#F
-
-                except Exception as e:
-                    print(f"处理文件 {filepath} 时出错: {e}")
-
-    # 将提取到的不重复人名写入names.txt文件，使用黑白方块格式
-    if all_unique_names:
-        try:
-            with open(NAMES_FILE, 'w', encoding='utf-8') as f_names:
-                sorted_names = sorted(list(all_unique_names)) # 按字母顺序排序后写入
-                for i, name in enumerate(sorted_names):
-                    # 写入原文部分（只有名字，不带#F）
-                    f_names.write(f"{name}\n")
-                    # 写入白色分隔符
-                    f_names.write(WHITE_DELIMITER + "\n")
-                    # 写入译文部分（初始与原文相同，只有名字，不带#F，供用户修改）
-                    f_names.write(f"{name}\n")
-                    # 如果不是最后一个名字，写入黑色分隔符
-                    if i < len(sorted_names) - 1:
-                        f_names.write(BLACK_DELIMITER + "\n")
-            print(f"提取到 {len(all_unique_names)} 个不重复人名，已写入 '{NAMES_FILE}'")
-            print(f"请编辑 '{NAMES_FILE}' 文件中的白色方块下方部分来修改人名译文。")
-        except Exception as e:
-            print(f"写入 '{NAMES_FILE}' 时出错: {e}")
-    else:
-         print("未在任何文件的原文中找到人名。")
-
-
-def write_names(directory):
-    """
-    读取names.txt文件，建立人名映射，然后根据映射更新其他txt文件的译文部分。
-    如果在原文中遇到names.txt中没有映射的人名，则报错停止。
-    在写入时自动为译文人名添加#F包裹。
-    """
-    print(f"正在根据 '{NAMES_FILE}' 更新文件...")
-    name_map = {}
-
-    # 检查 names.txt 是否存在
-    if not os.path.exists(NAMES_FILE):
-        print(f"错误: 未找到人名文件 '{NAMES_FILE}'。请先运行提取模式 (-e)。")
-        sys.exit(1) # 报错停止
-
-    # 读取 names.txt 文件，建立人名映射
-    try:
-        with open(NAMES_FILE, 'r', encoding='utf-8') as f_names:
-            names_content = f_names.read()
-
-        name_blocks = re.split(re.escape(BLACK_DELIMITER) , names_content)
-        for i, name_block in enumerate(name_blocks):
-            parts = name_block.split(WHITE_DELIMITER, 1)  
-            if len(parts) != 2:
-                print(f"错误: '{NAMES_FILE}' 中第 {i+1} 个人名块格式不正确，无法按白色方块分隔。请检查文件格式。")
-                sys.exit(1) # 格式错误，报错停止
-
-            original_name = parts[0].strip() # 获取原文名字（不带#F）
-            new_name = parts[1].strip()     # 获取译文名字（不带#F）
-
-            if not original_name:
-                 print(f"错误: '{NAMES_FILE}' 中第 {i+1} 个人名块原文部分为空。请检查文件格式。")
-                 sys.exit(1) # 格式错误，报错停止
-
-            name_map[original_name] = new_name
-
-        if not name_map:
-            print(f"警告: 未从 '{NAMES_FILE}' 中解析到有效的人名映射。")
-            # 如果names.txt为空或解析失败，但用户执行写入，可能不是错误，只是没有名字需要替换
-            # 但如果后续文件中有名字，而map为空，就会报错，所以这里不sys.exit(1)
-
-    except Exception as e:
-        print(f"读取或解析 '{NAMES_FILE}' 时出错: {e}")
-        sys.exit(1) # 读取names.txt出错，报错停止
-
-    # 遍历指定目录下的其他txt文件，进行人名替换
-    for root, _, files in os.walk(directory):
-        for filename in files:
-             # 忽略 names.txt 文件本身
-            if filename.endswith('.txt') and filename != NAMES_FILE:
-                filepath = os.path.join(root, filename)
-                # print(f"处理文件进行写入: {filepath}") # 调试用，正式运行时可注释
-
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f_orig:
-                        original_content = f_orig.read()
-
-                    # 根据黑色方块分割原文件内容
-                    original_blocks = re.split( BLACK_DELIMITER , original_content)
-                    new_content_blocks = []
-                    # 添加第一个块（文件头），如果存在的话
-                    if original_blocks:
-                        new_content_blocks.append(original_blocks[0])
-
-                    # 逐块处理并替换译文中的人名
-                    # 从第二个块开始遍历
-                    for i in range(1, len(original_blocks)):
-                        parts = original_blocks[i].split(WHITE_DELIMITER, 1)
-
-                        if len(parts) != 2:
-                            # print(f"警告: 文件 '{filepath}' 的块 {i} 分隔失败，保留原块内容。") # 避免过多输出
-                            new_content_blocks.append(original_blocks[i])
-                            continue
-
-                        original_text = parts[0]
-                        
-                        translated_text = parts[1]
-                        current_translated_text = translated_text # 用于逐步替换
-
-                        # 查找原文部分的所有人名（带#F）
-                        original_name_patterns_in_block = NAME_PATTERN.findall(original_text)
-
-                        # 遍历找到的人名，进行替换
-                        for original_name_raw in original_name_patterns_in_block: # 提取到的是不带#F的名字
-                            if original_name_raw in name_map:
-                                new_name_raw = name_map[original_name_raw]
-                                # 构建要替换成的新字符串（带#F）
-                                new_name_string = f"#F{new_name_raw}#F"
-
-                                # 在译文部分查找第一个 #F...#F 模式并替换
-                                # 使用 re.sub 的 count=1 确保只替换第一个匹配项
-                                current_translated_text, count = re.subn(NAME_PATTERN, new_name_string, current_translated_text, count=1)
-
-                                if count == 0:
-                                     # 如果原文中有名字，但在译文中没有找到#F...#F模式进行替换，说明格式有问题
-                                     print(f"错误: 文件 '{filepath}' 的块 {i} 的原文中包含人名 '{original_name_raw}'，但在译文部分未找到 #F...#F 模式进行替换。请检查文件格式。")
-                                     sys.exit(1) # 报错停止
-
-                            else:
-                                # 如果原文中的人名不在name_map中，则报错停止
-                                print(f"错误: 文件 '{filepath}' 的块 {i} 的原文中包含人名 '{original_name_raw}'，但在 '{NAMES_FILE}' 中未找到对应的映射。请将此人名添加到 '{NAMES_FILE}' 并提供译文。")
-                                sys.exit(1) # 报错停止
-
-                        # 重构块：原文 + 白色分隔符 + 修改后的译文
-                        reconstructed_block = original_text +   WHITE_DELIMITER + current_translated_text
-                        new_content_blocks.append(reconstructed_block)
-
-                    # 拼接所有块并写回原文件
-                    final_content = ""
-                    if new_content_blocks:
-                        final_content +=  ( BLACK_DELIMITER ).join(new_content_blocks)
-
-
-                    with open(filepath, 'w', encoding='utf-8') as f_orig:
-                        f_orig.write(final_content)
-                    print(f"成功更新文件: {filepath}")
-
-                except Exception as e:
-                    print(f"处理文件 {filepath} 时出错: {e}")
-
-
-def main():
-    parser = argparse.ArgumentParser(description="根据黑白方块分隔符提取或写入文本中的人名。")
-    parser.add_argument('directory', help='包含txt文件的目录。')
-    parser.add_argument('-e', '--extract', action='store_true', help='提取人名并创建names.txt文件。')
-    parser.add_argument('-w', '--write', action='store_true', help='根据names.txt文件写入修改后的人名到原文件。')
-
-    args = parser.parse_args()
-
-    if not args.extract and not args.write:
-        print("请指定模式：-e (提取) 或 -w (写入)。")
-        parser.print_help()
-        sys.exit(1)
-
-    if not os.path.isdir(args.directory):
-        print(f"错误: 目录不存在: {args.directory}")
-        sys.exit(1)
-
-    if args.extract:
-        extract_names(args.directory)
-
-    if args.write:
-        write_names(args.directory)
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import re
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# 定义分隔符
+BLACK_DELIMITER = '■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■' 
+WHITE_DELIMITER = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□' 
+NAME_PATTERN = re.compile(r'#F(.*?)#F') # 匹配 #F...#F 中的内容
+NAMES_FILE = 'names.txt' # 存放所有人名列表和译文的文件
+CACHE_FILE = 'names_cache.json' # 记录每个文件的修改时间、内容哈希和人名，用于增量处理
+
+
+def content_hash(content):
+    """计算文本内容的哈希，用于判断文件是否需要重新处理。"""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def list_txt_files(directory):
+    """列出目录下所有需要处理的txt文件（忽略 names.txt 本身），按路径排序。"""
+    filepaths = []
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith('.txt') and filename != NAMES_FILE:
+                filepaths.append(os.path.join(root, filename))
+    filepaths.sort()
+    return filepaths
+
+
+def load_cache(directory):
+    """
+    读取缓存文件。缓存只对生成它的目录有效，目录不同或文件损坏时返回空缓存。
+    结构: {'directory': ..., 'map_hash': ..., 'files': {路径: {'mtime', 'hash', 'names'}}}
+    """
+    empty = {'directory': os.path.abspath(directory), 'map_hash': None, 'files': {}}
+    if not os.path.exists(CACHE_FILE):
+        return empty
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if cache.get('directory') != empty['directory'] or not isinstance(cache.get('files'), dict):
+        return empty
+    return cache
+
+
+def save_cache(cache):
+    try:
+        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"写入缓存 '{CACHE_FILE}' 时出错: {e}")
+
+
+def run_tasks(func, tasks, jobs, initializer=None, initargs=()):
+    """
+    用进程池并行执行任务，结果顺序与任务顺序一致。
+    任务很少或只用一个进程时直接在当前进程执行，省去启动进程池的开销。
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        return [func(task) for task in tasks]
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(func, tasks, chunksize=chunksize))
+
+
+def find_names(content):
+    """从文件内容的原文部分提取人名（不带#F），按出现顺序去重。"""
+    names = {}
+    # 根据黑色方块分割成块
+    for block in re.split(re.escape(BLACK_DELIMITER), content):
+        parts = block.split(WHITE_DELIMITER, 1)
+        if len(parts) == 2:
+            for name in NAME_PATTERN.findall(parts[0]):
+                names[name] = None
+    return list(names)
+
+
+def scan_file(filepath):
+    """提取单个文件中的人名。返回 (路径, 修改时间, 内容哈希, 人名列表, 错误信息)。"""
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return filepath, mtime, content_hash(content), find_names(content), None
+    except Exception as e:
+        return filepath, None, None, [], str(e)
+
+
+def read_names_file():
+    """
+    宽松地读取已有的 names.txt，返回 {原文名字: 译文名字}。
+    用于提取时保留已经翻译好的人名，格式有问题的块直接跳过。
+    """
+    name_map = {}
+    if not os.path.exists(NAMES_FILE):
+        return name_map
+    try:
+        with open(NAMES_FILE, 'r', encoding='utf-8') as f_names:
+            names_content = f_names.read()
+    except Exception as e:
+        print(f"读取 '{NAMES_FILE}' 时出错: {e}")
+        return name_map
+    for name_block in re.split(re.escape(BLACK_DELIMITER), names_content):
+        parts = name_block.split(WHITE_DELIMITER, 1)
+        if len(parts) == 2 and parts[0].strip():
+            name_map[parts[0].strip()] = parts[1].strip()
+    return name_map
+
+
+def extract_names(directory, jobs=None):
+    """
+    从指定目录下的txt文件原文部分提取所有不重复人名，并写入names.txt文件。
+    names.txt 使用黑白方块格式，原文和译文部分都只有提取到的名字（不带#F）。
+    只重新扫描自上次提取以来修改过的文件，其余文件的人名直接取自缓存；
+    names.txt 中已经填写的译文会被保留。
+    """
+    print(f"正在从文件提取人名到 '{NAMES_FILE}'...")
+    cache = load_cache(directory)
+    cached_files = cache['files']
+    files = {}
+    to_scan = []
+
+    for filepath in list_txt_files(directory):
+        entry = cached_files.get(filepath)
+        try:
+            mtime = os.stat(filepath).st_mtime_ns
+        except OSError as e:
+            print(f"处理文件 {filepath} 时出错: {e}")
+            continue
+        if entry is not None and entry.get('mtime') == mtime:
+            files[filepath] = entry
+        else:
+            to_scan.append(filepath)
+
+    for filepath, mtime, hash_, names, error in run_tasks(scan_file, to_scan, jobs):
+        if error is not None:
+            print(f"处理文件 {filepath} 时出错: {error}")
+            continue
+        files[filepath] = {'mtime': mtime, 'hash': hash_, 'names': names}
+
+    print(f"扫描了 {len(to_scan)} 个文件，{len(files) - len(to_scan)} 个文件未修改，使用缓存。")
+    cache['files'] = files
+
+    all_unique_names = set()
+    for entry in files.values():
+        all_unique_names.update(entry['names'])
+
+    # 将提取到的不重复人名写入names.txt文件，使用黑白方块格式
+    if all_unique_names:
+        old_map = read_names_file()
+        sorted_names = sorted(all_unique_names) # 按字母顺序排序后写入
+        if list(old_map) == sorted_names:
+            print(f"人名没有变化，'{NAMES_FILE}' 保持不变（共 {len(sorted_names)} 个）。")
+            save_cache(cache)
+            return
+        try:
+            with open(NAMES_FILE, 'w', encoding='utf-8') as f_names:
+                for i, name in enumerate(sorted_names):
+                    # 写入原文部分（只有名字，不带#F）
+                    f_names.write(f"{name}\n")
+                    # 写入白色分隔符
+                    f_names.write(WHITE_DELIMITER + "\n")
+                    # 写入译文部分（已有译文则保留，否则与原文相同，只有名字，不带#F，供用户修改）
+                    f_names.write(f"{old_map.get(name, name)}\n")
+                    # 如果不是最后一个名字，写入黑色分隔符
+                    if i < len(sorted_names) - 1:
+                        f_names.write(BLACK_DELIMITER + "\n")
+            print(f"提取到 {len(all_unique_names)} 个不重复人名，已写入 '{NAMES_FILE}'")
+            print(f"请编辑 '{NAMES_FILE}' 文件中的白色方块下方部分来修改人名译文。")
+        except Exception as e:
+            print(f"写入 '{NAMES_FILE}' 时出错: {e}")
+    else:
+         print("未在任何文件的原文中找到人名。")
+    save_cache(cache)
+
+
+_name_map = {}
+
+def _init_name_map(name_map):
+    global _name_map
+    _name_map = name_map
+
+
+def rewrite_names(filepath, content):
+    """
+    按人名映射替换单个文件内容中译文部分的人名，返回 (新内容, 错误信息)。
+    """
+    # 根据黑色方块分割原文件内容
+    original_blocks = re.split(re.escape(BLACK_DELIMITER), content)
+    new_content_blocks = []
+    # 添加第一个块（文件头），如果存在的话
+    if original_blocks:
+        new_content_blocks.append(original_blocks[0])
+
+    # 逐块处理并替换译文中的人名
+    # 从第二个块开始遍历
+    for i in range(1, len(original_blocks)):
+        parts = original_blocks[i].split(WHITE_DELIMITER, 1)
+
+        if len(parts) != 2:
+            new_content_blocks.append(original_blocks[i])
+            continue
+
+        original_text = parts[0]
+        current_translated_text = parts[1] # 用于逐步替换
+
+        # 遍历原文部分找到的人名（不带#F），进行替换
+        for original_name_raw in NAME_PATTERN.findall(original_text):
+            if original_name_raw not in _name_map:
+                # 如果原文中的人名不在name_map中，则报错
+                return None, f"错误: 文件 '{filepath}' 的块 {i} 的原文中包含人名 '{original_name_raw}'，但在 '{NAMES_FILE}' 中未找到对应的映射。请将此人名添加到 '{NAMES_FILE}' 并提供译文。"
+
+            # 构建要替换成的新字符串（带#F）
+            new_name_string = f"#F{_name_map[original_name_raw]}#F"
+
+            # 在译文部分查找第一个 #F...#F 模式并替换
+            # 使用 re.sub 的 count=1 确保只替换第一个匹配项
+            current_translated_text, count = NAME_PATTERN.subn(lambda _: new_name_string, current_translated_text, count=1)
+
+            if count == 0:
+                # 如果原文中有名字，但在译文中没有找到#F...#F模式进行替换，说明格式有问题
+                return None, f"错误: 文件 '{filepath}' 的块 {i} 的原文中包含人名 '{original_name_raw}'，但在译文部分未找到 #F...#F 模式进行替换。请检查文件格式。"
+
+        # 重构块：原文 + 白色分隔符 + 修改后的译文
+        new_content_blocks.append(original_text + WHITE_DELIMITER + current_translated_text)
+
+    # 拼接所有块
+    return BLACK_DELIMITER.join(new_content_blocks), None
+
+
+def write_file(task):
+    """
+    处理单个文件的写入。task 为 (路径, 缓存的内容哈希, 是否写入)，内容哈希未变时直接跳过。
+    不写入时只检查，需要修改的文件返回 'pending'，这样可以在改动任何文件之前找出全部错误。
+    返回 (路径, 状态, 修改时间, 内容哈希, 人名列表, 错误信息)，状态为 'skip'、'same'、'pending'、'written' 或 'error'。
+    """
+    filepath, cached_hash, write = task
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f_orig:
+            original_content = f_orig.read()
+        original_hash = content_hash(original_content)
+        if original_hash == cached_hash:
+            return filepath, 'skip', os.stat(filepath).st_mtime_ns, original_hash, None, None
+
+        final_content, error = rewrite_names(filepath, original_content)
+        if error is not None:
+            return filepath, 'error', None, None, None, error
+
+        names = find_names(original_content)
+        if final_content == original_content:
+            return filepath, 'same', os.stat(filepath).st_mtime_ns, original_hash, names, None
+        if not write:
+            return filepath, 'pending', None, None, names, None
+
+        with open(filepath, 'w', encoding='utf-8') as f_orig:
+            f_orig.write(final_content)
+        return filepath, 'written', os.stat(filepath).st_mtime_ns, content_hash(final_content), names, None
+    except Exception as e:
+        return filepath, 'error', None, None, None, f"处理文件 {filepath} 时出错: {e}"
+
+
+def write_names(directory, jobs=None):
+    """
+    读取names.txt文件，建立人名映射，然后根据映射更新其他txt文件的译文部分。
+    如果在原文中遇到names.txt中没有映射的人名，则报告所有出错的文件并停止，不修改任何文件。
+    在写入时自动为译文人名添加#F包裹。
+    人名映射没变时，内容哈希与上次写入后相同的文件直接跳过；替换后内容不变的文件不会重写。
+    """
+    print(f"正在根据 '{NAMES_FILE}' 更新文件...")
+    name_map = {}
+
+    # 检查 names.txt 是否存在
+    if not os.path.exists(NAMES_FILE):
+        print(f"错误: 未找到人名文件 '{NAMES_FILE}'。请先运行提取模式 (-e)。")
+        sys.exit(1) # 报错停止
+
+    # 读取 names.txt 文件，建立人名映射
+    try:
+        with open(NAMES_FILE, 'r', encoding='utf-8') as f_names:
+            names_content = f_names.read()
+
+        name_blocks = re.split(re.escape(BLACK_DELIMITER) , names_content)
+        for i, name_block in enumerate(name_blocks):
+            parts = name_block.split(WHITE_DELIMITER, 1)  
+            if len(parts) != 2:
+                print(f"错误: '{NAMES_FILE}' 中第 {i+1} 个人名块格式不正确，无法按白色方块分隔。请检查文件格式。")
+                sys.exit(1) # 格式错误，报错停止
+
+            original_name = parts[0].strip() # 获取原文名字（不带#F）
+            new_name = parts[1].strip()     # 获取译文名字（不带#F）
+
+            if not original_name:
+                 print(f"错误: '{NAMES_FILE}' 中第 {i+1} 个人名块原文部分为空。请检查文件格式。")
+                 sys.exit(1) # 格式错误，报错停止
+
+            name_map[original_name] = new_name
+
+        if not name_map:
+            print(f"警告: 未从 '{NAMES_FILE}' 中解析到有效的人名映射。")
+            # 如果names.txt为空或解析失败，但用户执行写入，可能不是错误，只是没有名字需要替换
+            # 但如果后续文件中有名字，而map为空，就会报错，所以这里不sys.exit(1)
+
+    except Exception as e:
+        print(f"读取或解析 '{NAMES_FILE}' 时出错: {e}")
+        sys.exit(1) # 读取names.txt出错，报错停止
+
+    cache = load_cache(directory)
+    map_hash = content_hash(json.dumps(name_map, ensure_ascii=False, sort_keys=True))
+    map_changed = cache.get('map_hash') != map_hash
+    cached_files = cache['files']
+
+    # 遍历指定目录下的其他txt文件，进行人名替换
+    tasks = []
+    for filepath in list_txt_files(directory):
+        entry = cached_files.get(filepath)
+        cached_hash = None
+        if entry is not None and not map_changed and entry.get('written'):
+            cached_hash = entry.get('hash')
+        tasks.append((filepath, cached_hash, False))
+
+    # 先检查全部文件，有一个出错就一个都不写，不会出现一部分文件已经替换、另一部分还没有的情况
+    results = run_tasks(write_file, tasks, jobs, _init_name_map, (name_map,))
+    errors = [error for *_, error in results if error is not None]
+    if errors:
+        for error in errors:
+            print(error)
+        print(f"{len(errors)} 个文件有错误，没有修改任何文件。")
+        sys.exit(1) # 报错停止
+
+    pending = [(filepath, None, True) for filepath, status, *_ in results if status == 'pending']
+    results = [result for result in results if result[1] != 'pending']
+    results += run_tasks(write_file, pending, jobs, _init_name_map, (name_map,))
+
+    counts = {'skip': 0, 'same': 0, 'written': 0, 'error': 0}
+    for filepath, status, mtime, hash_, names, error in results:
+        counts[status] += 1
+        if status == 'error':
+            errors.append(error)
+            cached_files.pop(filepath, None)
+            continue
+        if status == 'written':
+            print(f"成功更新文件: {filepath}")
+        entry = cached_files.get(filepath, {})
+        entry.update({'mtime': mtime, 'hash': hash_, 'written': True})
+        if names is not None:
+            entry['names'] = names
+        elif 'names' not in entry:
+            entry['mtime'] = None # 没有人名缓存，下次提取时重新扫描
+        cached_files[filepath] = entry
+
+    cache['map_hash'] = map_hash # 出错的文件已从缓存移除，下次会重新处理
+    save_cache(cache)
+
+    print(f"更新 {counts['written']} 个文件，{counts['same']} 个文件无需修改，{counts['skip']} 个文件未变化已跳过。")
+    if errors:
+        # 检查通过后写入时才出错（比如文件被占用），上面已经列出了写入成功的文件
+        for error in errors:
+            print(error)
+        sys.exit(1) # 报错停止
+
+
+def main():
+    parser = argparse.ArgumentParser(description="根据黑白方块分隔符提取或写入文本中的人名。")
+    parser.add_argument('directory', help='包含txt文件的目录。')
+    parser.add_argument('-e', '--extract', action='store_true', help='提取人名并创建names.txt文件。')
+    parser.add_argument('-w', '--write', action='store_true', help='根据names.txt文件写入修改后的人名到原文件。')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数（默认: CPU 核心数）。')
+
+    args = parser.parse_args()
+
+    if not args.extract and not args.write:
+        print("请指定模式：-e (提取) 或 -w (写入)。")
+        parser.print_help()
+        sys.exit(1)
+
+    if not os.path.isdir(args.directory):
+        print(f"错误: 目录不存在: {args.directory}")
+        sys.exit(1)
+
+    if args.extract:
+        extract_names(args.directory, args.jobs)
+
+    if args.write:
+        write_names(args.directory, args.jobs)
+
+if __name__ == "__main__":
+    main()
@@ -1,263 +1,713 @@
-import struct
-import os
-import sys
-import re
-
-def xor_encrypt(data: bytes, key_byte: int = 0xff) -> bytearray:
-    encrypted_data = bytearray(data)
-    for i in range(len(encrypted_data)):
-        encrypted_data[i] ^= (i & key_byte)
-    return encrypted_data
-
-def compress(data):
-    window = bytearray(4096)
-    write_pos = 0xfee
-    bit_buffer = []
-    output = []
-    data_buffer = []
-    current = 0
-
-    while current < len(data):
-        best_offset, best_len = find_best_match(window, write_pos, data, current)
-        if best_len >= 3:
-            bit_buffer.append(0)
-            offset_low = best_offset & 0xff
-            offset_high = (best_offset >> 8) & 0x0f
-            length_code = (best_len - 3) & 0x0f
-            byte1 = offset_low
-            byte2 = (offset_high << 4) | length_code
-            data_buffer.append(byte1)
-            data_buffer.append(byte2)
-            for i in range(best_len):
-                window[write_pos] = data[current + i]
-                write_pos = (write_pos + 1) % 4096
-            current += best_len
-        else:
-            bit_buffer.append(1)
-            literal = data[current]
-            data_buffer.append(literal)
-            window[write_pos] = literal
-            write_pos = (write_pos + 1) % 4096
-            current += 1
-
-        while len(bit_buffer) >= 8:
-            byte = 0
-            for i in range(8):
-                if i < len(bit_buffer) and bit_buffer[i]:
-                    byte |= (1 << i)
-            output.append(byte)
-            bit_buffer = bit_buffer[8:]
-            output.extend(data_buffer)
-            data_buffer.clear()
-
-    if bit_buffer:
-        while len(bit_buffer) < 8:
-            bit_buffer.append(0)
-        byte = 0
-        for i in range(8):
-            if bit_buffer[i]:
-                byte |= (1 << i)
-        output.append(byte)
-
-    output.extend(data_buffer)
-
-    return xor_encrypt(bytes(output))
-
-def find_best_match(window, write_pos, data, current):
-    max_len = 0
-    best_start = 0
-    max_possible_len = min(len(data) - current, 18)
-
-    if max_possible_len < 3:
-        return (0, 0)
-
-    #for offset in range(1, 4096):
-    if len(sys.argv) > 3:
-        头 = 4096
-        尾 = 0
-    else:
-        头 = 0
-        尾 = 4096        
-
-    for offset in range(头, 尾):
-        start = (write_pos - offset) % 4096
-        current_len = 0
-        while current_len < max_possible_len and current + current_len < len(data):
-            window_pos = (start + current_len) % 4096
-            if window[window_pos] == data[current + current_len]:
-                current_len += 1
-            else:
-                break
-        if current_len > max_len and offset >=8:
-            max_len = current_len
-            best_start = start
-            if max_len == max_possible_len:
-                break
-
-    return (best_start, max_len) if max_len >= 3 else (0, 0)
-
-def raed_bin(input, dir = '.'):
-    input = os.path.join(dir, input)
-    if os.path.exists(input):
-        with open(input, 'rb') as f:
-            raw_data = f.read()
-            f.close()
-            return raw_data
-    else:
-        return bytes() 
-
-def pack_block_compress(table1, table2, table3, opcode, str1, str2, 描述文本):
-
-    描述文本_ = 描述文本.encode(编码, errors='ignore')
-    if len(描述文本_) > 0x2C:
-        print(f'描述文本过长：{描述文本}')
-        sys.exit()
-    
-    raw_data = table1 + table2 + table3 + opcode + str1 + str2
-
-    compressed_data =  compress(raw_data)
-
-    header = bytearray(0xC8)
-    header[:0xE] = b'SCW for GswSys'
-    struct.pack_into('<I', header, 0x10, 0x3000003)
-    struct.pack_into('<I', header, 0x14,  0xFFFFFFFF)
-    struct.pack_into('<I', header, 0x18, len(compressed_data))
-    struct.pack_into('<I', header, 0x1C, len(raw_data))
-    struct.pack_into('<I', header, 0x24, 1)
-    struct.pack_into('<I', header, 0x28, len(table1) // 16)
-    struct.pack_into('<I', header, 0x2C, len(table2) // 16)
-    struct.pack_into('<I', header, 0x30, len(table3) // 16)
-    struct.pack_into('<I', header, 0x34, len(opcode))
-    struct.pack_into('<I', header, 0x38, len(str1))
-    struct.pack_into('<I', header, 0x3C, len(str2))
-    header[0x88 : 0x88 + len(描述文本_)] = 描述文本_
-
-    return bytes(header) + compressed_data
-
-def create_idx(item):
-    if os.path.exists(item):
-        with open(item, 'r', encoding='utf-8') as f:
-            content = f.read()
-            splits = re.split(r'\s*■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■\s*', content)
-            new_splits = [splits[0]]
-            delimiter = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□'
-            for split in splits[1:]:
-                if delimiter not in split:
-                    print(f'{item}——{split}：译文拆分失败！')
-                    sys.exit()
-                text = split.split(delimiter, 1)[1].strip()
-                if text == '':
-                    text = '　' #单空格情况实在是匹配不到，所以只能这样了
-                    
-                new_splits.append(text)        
-            f.close()
-            
-        return new_splits
-    else:
-        return None
-
-def pack_block_construct(item):
-    item_dir = os.path.join(work_dir, item)
-
-    split = create_idx(f'{os.path.join(work_dir, item)}.txt')
-
-    if split is None:
-        str1_data = bytes()
-        table2_data = bytes()
-        描述文本 = item      
-    else:
-        result = ((m := re.search(r'；；(.*?)\n；；(\d+)', split[0])) and (m.group(1), int(m.group(2))) or None)
-        if result is None:
-            print(f"{input}：未发现描述文本或文本数！")
-            sys.exit()
-        描述文本, 文本数 = result
-        str_1_idx = split[1:]
-        str_1_idx_current = len(str_1_idx)
-        
-        if 文本数 != str_1_idx_current:
-            print(f"{input}：文本数不匹配！\n应为{文本数} ！实则{str_1_idx_current}！")
-            sys.exit()
-    
-        str_dict = {}
-        str1_data = bytearray()
-        table2_data = bytearray(str_1_idx_current * 16)
-        current_address = 0
-
-        for key in str_1_idx:
-            if key in str_dict:
-                    str_dict[key].append(current_address)
-            else:
-                    str_dict[key] = [current_address]
-            current_address += 16
-
-        for key, addres in str_dict.items():
-            string_data = key.encode(编码, errors='ignore') + b'\x00'
-            string_len = len(string_data)
-            for addr in addres:
-                struct.pack_into('<I', table2_data, addr, len(str1_data))
-                struct.pack_into('<I', table2_data, addr + 8, string_len)
-            str1_data += string_data
-
-    #    现在用的是优化逻辑，注释掉的是原本的构建逻辑
-    #    for string in str_1_idx:
-    #        string_data = string.encode(编码, errors='ignore') + b'\x00'
-    #        
-    #        struct.pack_into('<I', table2_data, current_address, len(str1_data))
-    #        struct.pack_into('<I', table2_data, current_address + 8, len(string_data))
-    #
-    #        str1_data += string_data
-    #        
-    #        current_address += 16
-
-    table1_data = raed_bin('table1.bin', item_dir)
-    table3_data = raed_bin('table3.bin', item_dir)
-    opcode_data = raed_bin('opcode.bin', item_dir)
-    str2_data = raed_bin('str2.bin', item_dir)
-
-    block = pack_block_compress(table1_data, table2_data, table3_data, opcode_data, str1_data, str2_data, 描述文本)
-
-    return block
-
-def pack():
-    items =  [d for d in os.listdir(work_dir) if os.path.isdir(os.path.join(work_dir, d))]
-    current_address = 0
-    list = bytearray(len(items) * 0x28)
-    data = bytearray()
-
-    for item in items:
-
-        item_block = pack_block_construct(item)
-
-        item_name = item.encode(编码, errors='ignore')
-        list[current_address : current_address + len(item_name)] = item_name
-        struct.pack_into('<I', list, current_address + 0x20, len(data))
-        struct.pack_into('<I', list, current_address + 0x24, len(item_block))
-        data.extend(item_block)
-
-        print(f'{current_address // 0x28}：{item}')
-        current_address += 0x28
-
-    list_compress = compress(list)
-
-    header = bytearray(0x1C)
-    header[:0xF] = b'GswSys PACK 2.0'
-    struct.pack_into('<I', header, 0x10, len(list_compress))
-    struct.pack_into('<I', header, 0x14, len(items))
-    
-    header.extend(list_compress)
-
-    struct.pack_into('<I', header, 0x18, len(header))
-
-    header.extend(data)
-    
-    with open(out_pack, 'wb') as f:
-        f.write(header)
-        f.close()
-
-
-
-if __name__ == "__main__":
-    编码 = 'cp936'
-    work_dir = sys.argv[1]
-    out_pack = sys.argv[2]
-    pack()
+import struct
+import os
+import sys
+import re
+import argparse
+import json
+import hashlib
+import math
+import time
+from collections import Counter
+import store
+import sections
+import unpack
+import validate
+import profiler
+import pakfmt
+
+压缩级别 = 'auto' # 默认压缩级别，见 LEVELS
+# store: 不搜索匹配，全部按文字输出，标志字节批量生成（最快，封包最大）
+# fast: 哈希链，每个位置只看最近的 4 个候选，贪心匹配
+# normal: 哈希链，最多看 32 个候选，惰性匹配（先看下一个位置，那里的匹配更长就先输出一个文字）
+# max: 搜索整个窗口，惰性匹配（最慢，封包最小）
+# auto: 每一块分别抽样，按熵和大小从上面几种里选（见 choose_level）
+LEVELS = ('store', 'fast', 'normal', 'max', 'auto')
+REUSED = 'reused' # 报告中从原封包复用的块的级别
+CHAIN_DEPTH = {'fast': 4, 'normal': 32}
+SMALL_BLOCK = 0x4000            # 不超过这个大小的块用 max
+PROBE_SIZE = 0x1000             # 每段抽样的大小
+PROBE_COUNT = 4                 # 大块抽样的段数
+INCOMPRESSIBLE_ENTROPY = 7.5    # 抽样熵（位/字节）不低于这个值……
+INCOMPRESSIBLE_DISTINCT = 0.95  # ……且不同的 3 字节组合占比不低于这个值时，视为无法压缩
+构建报告 = None # 指定 --report 时为列表，记录每一块的压缩信息
+压缩统计 = False # 为 True 时（--stats）报告里加上每一块的文字/匹配统计（见 token_stats）
+尾部合并 = False # 为 True 时字符串池复用相同的后缀（见 tail_merge）
+源封包 = None # 指定 --source 时为 {文件名: (绝对偏移, 大小)}，没有变化的块直接从原封包复制
+源封包文件 = None
+数据库 = None  # 指定 SQLite 数据库（见 store.py）时从数据库读取文本，不再读取txt文件
+格式 = pakfmt.GSWSYS # 输出封包的布局（-f），见 pakfmt.py
+分段容器 = None # 解包目录里有 sections.bin（unpack.py --sections）时为打开的容器，见 sections.py
+
+xor_encrypt = pakfmt.xor
+
+def compress_literals(data):
+    """
+    全部按文字输出：每 8 个字节前面加一个 0xFF 标志字节，用切片一次填好，不逐字节处理
+    最后不足 8 个字节时，标志字节只设置对应的低位，解压时读到后面的匹配位就会因为没有数据而结束
+    """
+    data = bytes(data)
+    groups, rest = divmod(len(data), 8)
+    output = bytearray(groups * 9)
+    output[0::9] = b'\xff' * groups
+    for i in range(8):
+        output[1 + i::9] = data[i:groups * 8:8]
+    if rest:
+        output.append((1 << rest) - 1)
+        output += data[groups * 8:]
+    return output
+
+def compress(data, level=None, xor=True):
+    # xor 为 False 时返回未异或的数据（DataPack5 的索引表、图片块）
+    # 环形窗口初始全是 0，写入位置从 0xfee 开始，相当于数据前面有 4096 个 0
+    # 展开成线性缓冲后可以直接用 rfind 找匹配，也自然支持与正在写入的数据重叠的匹配
+    history = bytes(4096) + bytes(data)
+    bit_buffer = []
+    output = []
+    data_buffer = []
+    current = 0
+
+    level = level or 压缩级别
+    if level not in LEVELS:
+        raise ValueError(f'未知的压缩级别：{level}')
+    if level == 'auto':
+        level = choose_level(data)[0]
+    if level == 'store':
+        output = compress_literals(data)
+        if not xor:
+            return output
+        with profiler.phase('xor'):
+            return xor_encrypt(output)
+    if level == 'max':
+        find = lambda current: find_best_match(history, current)
+    else:
+        find = HashChainMatcher(history, CHAIN_DEPTH[level]).find
+    lazy = level in ('normal', 'max')
+    pending = None
+
+    while current < len(data):
+        if pending is not None:
+            (best_offset, best_len), pending = pending, None
+        else:
+            best_offset, best_len = find(current)
+        if lazy and 3 <= best_len < 18:
+            next_match = find(current + 1)
+            if next_match[1] > best_len:
+                # 下一个位置的匹配更长，这里先输出文字
+                best_len, pending = 0, next_match
+        if best_len >= 3:
+            bit_buffer.append(0)
+            offset_low = best_offset & 0xff
+            offset_high = (best_offset >> 8) & 0x0f
+            length_code = (best_len - 3) & 0x0f
+            byte1 = offset_low
+            byte2 = (offset_high << 4) | length_code
+            data_buffer.append(byte1)
+            data_buffer.append(byte2)
+            current += best_len
+        else:
+            bit_buffer.append(1)
+            literal = data[current]
+            data_buffer.append(literal)
+            current += 1
+
+        while len(bit_buffer) >= 8:
+            byte = 0
+            for i in range(8):
+                if i < len(bit_buffer) and bit_buffer[i]:
+                    byte |= (1 << i)
+            output.append(byte)
+            bit_buffer = bit_buffer[8:]
+            output.extend(data_buffer)
+            data_buffer.clear()
+
+    if bit_buffer:
+        while len(bit_buffer) < 8:
+            bit_buffer.append(0)
+        byte = 0
+        for i in range(8):
+            if bit_buffer[i]:
+                byte |= (1 << i)
+        output.append(byte)
+
+    output.extend(data_buffer)
+
+    if not xor:
+        return bytearray(output)
+    with profiler.phase('xor'):
+        return xor_encrypt(bytes(output))
+
+def find_best_match(history, current):
+    """
+    在 history（4096 个 0 + 原始数据）中为 data[current:] 找最长匹配，返回 (环形窗口中的偏移, 长度)
+    候选起点是前 1~4096 个字节，匹配串允许越过当前位置，解压时会边复制边写入，所以结果一致
+    """
+    pos = current + 4096
+    max_possible_len = min(len(history) - pos, 18)
+
+    if max_possible_len < 3:
+        return (0, 0)
+
+    lowest = pos - 4096
+    # rfind 找到的是最近的一处，连续的 0 或重复模式通常距离 1 就能匹配到最大长度
+    best_start = history.rfind(history[pos:pos + 3], lowest, pos + 2)
+    if best_start < 0:
+        return (0, 0)
+    max_len = 3
+    while max_len < max_possible_len:
+        if history[best_start + max_len] == history[pos + max_len]:
+            max_len += 1
+            continue
+        start = history.rfind(history[pos:pos + max_len + 1], lowest, pos + max_len)
+        if start < 0:
+            break
+        best_start = start
+        max_len += 1
+
+    # history 中下标 v 的字节写在环形窗口的 (0xfee + v - 4096) & 0xfff 处
+    return ((best_start + 0xfee) & 0xfff, max_len)
+
+class HashChainMatcher:
+    """
+    用哈希链找匹配：以 3 个字节为键记录每个位置，只检查最近的 depth 个候选
+    位置在查找时才按顺序插入，所以 find 的 current 必须单调不减
+    """
+    def __init__(self, history, depth):
+        self.history = history
+        self.depth = depth
+        self.chains = {}
+        self.inserted = 0
+
+    def find(self, current):
+        history = self.history
+        pos = current + 4096
+        max_possible_len = min(len(history) - pos, 18)
+
+        chains = self.chains
+        for p in range(self.inserted, min(pos, len(history) - 2)):
+            key = history[p:p + 3]
+            chain = chains.get(key)
+            if chain is None:
+                chains[key] = [p]
+            else:
+                chain.append(p)
+        self.inserted = max(self.inserted, pos)
+
+        if max_possible_len < 3:
+            return (0, 0)
+        chain = chains.get(history[pos:pos + 3])
+        if chain is None:
+            return (0, 0)
+
+        lowest = pos - 4096
+        best_start, max_len = -1, 0
+        for i in range(len(chain) - 1, max(len(chain) - 1 - self.depth, -1), -1):
+            start = chain[i]
+            if start < lowest:
+                break
+            length = 3
+            while length < max_possible_len and history[start + length] == history[pos + length]:
+                length += 1
+            if length > max_len:
+                best_start, max_len = start, length
+                if max_len == max_possible_len:
+                    break
+
+        if best_start < 0:
+            return (0, 0)
+        return ((best_start + 0xfee) & 0xfff, max_len)
+
+def choose_level(data):
+    """
+    auto 级别：抽样估计数据的熵和重复程度，返回 (压缩级别, 抽样熵)
+    几乎不重复的高熵数据直接按文字输出；小块用 max 搜索整个窗口；大块用 normal 的哈希链
+    """
+    n = len(data)
+    if n <= PROBE_SIZE * PROBE_COUNT:
+        sample = bytes(data)
+    else:
+        step = (n - PROBE_SIZE) // (PROBE_COUNT - 1)
+        sample = b''.join(bytes(data[i * step:i * step + PROBE_SIZE]) for i in range(PROBE_COUNT))
+    if len(sample) < 3:
+        return 'store', 0.0
+
+    total = len(sample)
+    entropy = sum(c / total * math.log2(total / c) for c in Counter(sample).values())
+    distinct = len({sample[i:i + 3] for i in range(total - 2)}) / (total - 2)
+    if entropy >= INCOMPRESSIBLE_ENTROPY and distinct >= INCOMPRESSIBLE_DISTINCT:
+        return 'store', entropy
+    if n <= SMALL_BLOCK:
+        return 'max', entropy
+    return 'normal', entropy
+
+def distance_label(bits):
+    """bit_length 为 bits 的距离所在的区间，例如 5 → '16-31'"""
+    return f'{1 << (bits - 1)}-{(1 << bits) - 1}' if bits < 13 else '4096'
+
+def token_stats(tokens):
+    """
+    解析压缩数据（未异或）的标志位和匹配，统计文字数、匹配数和匹配长度、距离的分布
+    距离是匹配开始时的写入位置往回数的字节数（1~4096），按 2 的幂分组
+    只在 --stats 时调用，压缩本身不受影响
+    """
+    literals = matches = match_bytes = 0
+    lengths = Counter()
+    distances = Counter()
+    n = len(tokens)
+    i, pos, flags = 0, 0xfee, 0
+    while True:
+        flags >>= 1
+        if not flags & 0x100:
+            if i >= n:
+                break
+            flags = 0xff00 | tokens[i]
+            i += 1
+        if flags & 1:
+            if i >= n:
+                break
+            literals += 1
+            i += 1
+            pos = (pos + 1) & 0xfff
+        else:
+            if i + 1 >= n:
+                break
+            b1, b2 = tokens[i], tokens[i + 1]
+            i += 2
+            length = (b2 & 0x0f) + 3
+            distance = (pos - (b1 | ((b2 & 0xf0) << 4))) & 0xfff or 0x1000
+            matches += 1
+            match_bytes += length
+            lengths[length] += 1
+            distances[distance.bit_length()] += 1
+            pos = (pos + length) & 0xfff
+    return {
+        'literals': literals,
+        'matches': matches,
+        'match_bytes': match_bytes,
+        'lengths': dict(sorted(lengths.items())),
+        'distances': {distance_label(bits): count for bits, count in sorted(distances.items())},
+    }
+
+def summarize_tokens(blocks):
+    """把每一块的统计合计成整个封包的统计，直方图的键换成可读的区间"""
+    total = {'literals': 0, 'matches': 0, 'match_bytes': 0}
+    lengths = Counter()
+    distances = Counter()
+    for block in blocks:
+        stats = block.get('tokens')
+        if stats is None:
+            continue
+        for key in total:
+            total[key] += stats[key]
+        lengths.update(stats['lengths'])
+        distances.update(stats['distances'])
+    total['average_match'] = round(total['match_bytes'] / total['matches'], 2) if total['matches'] else None
+    total['lengths'] = dict(sorted(lengths.items()))
+    total['distances'] = dict(sorted(distances.items(), key=lambda item: int(item[0].split('-')[0])))
+    return total
+
+def record_block(name, level, entropy, raw_size, compressed_size, seconds=None, tokens=None):
+    if 构建报告 is not None:
+        构建报告.append({
+            'name': name,
+            'level': level,
+            'entropy': None if entropy is None else round(entropy, 3),
+            'raw_size': raw_size,
+            'compressed_size': compressed_size,
+            'ratio': round(compressed_size / raw_size, 4) if raw_size else None,
+            'seconds': None if seconds is None else round(seconds, 6),
+        })
+        if tokens is not None:
+            构建报告[-1]['tokens'] = tokens
+
+def compress_block(name, data, xor=True):
+    """按当前压缩级别压缩一块数据，auto 时自动选择级别；开启报告时记录选择的级别和压缩率"""
+    with profiler.phase('compress'):
+        start = time.perf_counter()
+        level, entropy = choose_level(data) if 压缩级别 == 'auto' else (压缩级别, None)
+        compressed = compress(data, level, xor)
+        seconds = time.perf_counter() - start
+    if 压缩统计 and 构建报告 is not None:
+        tokens = token_stats(xor_encrypt(compressed) if xor else compressed)
+    else:
+        tokens = None
+    record_block(name, level, entropy, len(data), len(compressed), seconds, tokens)
+    return compressed
+
+def load_source(path):
+    """读取原封包的索引，之后内容没有变化的块直接从原封包复制；原封包的格式必须和输出的相同"""
+    global 源封包, 源封包文件
+    源封包文件 = open(path, 'rb')
+    try:
+        layout, data_offset, _, entries = pakfmt.read_index(源封包文件)
+    except ValueError as e:
+        print(f"错误：无法读取原封包 '{path}'：{e}")
+        sys.exit(1)
+    if layout is not 格式:
+        print(f"错误：原封包 '{path}' 是 {layout.name}，与输出格式 {格式.name} 不同")
+        sys.exit(1)
+    源封包 = {unpack.decode_name(name): (data_offset + offset, size) for name, offset, size in entries}
+
+def reuse_source_block(name, header, raw_data):
+    """
+    原封包中的同名块头部字段和描述文本都与 header 相同、解压后又与 raw_data 完全一致时，返回原来的整块数据
+    先比较头部，对不上就不用解压
+    """
+    if 源封包 is None or name not in 源封包:
+        return None
+    offset, size = 源封包[name]
+    源封包文件.seek(offset)
+    block = 源封包文件.read(size)
+    header_size = len(格式.scw_header)
+    if len(block) < header_size:
+        return None
+    for field in 格式.scw_constants:
+        if block[field:field + 4] != header[field:field + 4]:
+            return None
+    old, new = pakfmt.parse_scw_header(格式, block), pakfmt.parse_scw_header(格式, header)
+    compressed_size = old.pop('compressed_size')
+    new.pop('compressed_size')
+    old['description'] = old['description'].split(b'\x00')[0]
+    new['description'] = new['description'].split(b'\x00')[0]
+    if old != new:
+        return None
+
+    if header_size + compressed_size > len(block):
+        return None
+    if pakfmt.decompress(pakfmt.xor(block[header_size:header_size + compressed_size])) != raw_data:
+        return None
+
+    record_block(name, REUSED, None, len(raw_data), compressed_size)
+    return block
+
+def write_report(path):
+    """
+    把构建报告写成 JSON：每一块的压缩级别和压缩率，以及整个封包的汇总
+    压缩率和速度只按这次真正压缩的块计算，从原封包复用（--source）的块另外计数
+    """
+    compressed_blocks = [entry for entry in 构建报告 if entry['level'] != REUSED]
+    reused_blocks = [entry for entry in 构建报告 if entry['level'] == REUSED]
+    raw = sum(entry['raw_size'] for entry in compressed_blocks)
+    compressed = sum(entry['compressed_size'] for entry in compressed_blocks)
+    levels = {}
+    for entry in 构建报告:
+        levels[entry['level']] = levels.get(entry['level'], 0) + 1
+    seconds = sum(entry['seconds'] or 0 for entry in compressed_blocks)
+    report = {
+        'archive': out_pack,
+        'format': 格式.key,
+        'level': 压缩级别,
+        'summary': {
+            'blocks': len(构建报告),
+            'raw_size': raw,
+            'compressed_size': compressed,
+            'ratio': round(compressed / raw, 4) if raw else None,
+            'levels': levels,
+            'seconds': round(seconds, 6),
+            'mb_per_s': round(raw / seconds / (1 << 20), 3) if seconds else None,
+            'reused_blocks': len(reused_blocks),
+            'reused_bytes': sum(entry['raw_size'] for entry in reused_blocks),
+        },
+        'blocks': 构建报告,
+    }
+    if 压缩统计:
+        # 复用的块没有重新压缩，不计入统计，用不用 --source 的构建之间才能比较
+        report['summary']['tokens'] = summarize_tokens(compressed_blocks)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if 压缩统计:
+        tokens = report['summary']['tokens']
+        print(f"压缩统计：文字 {tokens['literals']}，匹配 {tokens['matches']}（平均长度 {tokens['average_match']}），"
+              f"压缩耗时 {seconds:.3f} 秒")
+
+def raed_bin(input, dir = '.'):
+    input = os.path.join(dir, input)
+    if os.path.exists(input):
+        with open(input, 'rb') as f:
+            raw_data = f.read()
+            f.close()
+            return raw_data
+    else:
+        return bytes() 
+
+def pack_block_compress(table1, table2, table3, opcode, str1, str2, 描述文本, name=None):
+
+    描述文本_ = 描述文本.encode(编码, errors='ignore')
+    if len(描述文本_) > pakfmt.DESCRIPTION_MAX:
+        print(f'描述文本过长：{描述文本}')
+        sys.exit()
+    
+    raw_data = table1 + table2 + table3 + opcode + str1 + str2
+
+    entry_size = 格式.table_entry_size
+    header = pakfmt.scw_header(格式, {
+        'compressed_size': 0, # 压缩后再填
+        'raw_size': len(raw_data),
+        'table1': len(table1) // entry_size,
+        'table2': len(table2) // entry_size,
+        'table3': len(table3) // entry_size,
+        'opcode': len(opcode),
+        'str1': len(str1),
+        'str2': len(str2),
+    }, 描述文本_)
+
+    with profiler.phase('reuse'):
+        reused = reuse_source_block(name, header, raw_data)
+    if reused is not None:
+        return reused
+
+    compressed_data = compress_block(name or 描述文本, raw_data)
+    struct.pack_into('<I', header, 格式.scw_fields['compressed_size'], len(compressed_data))
+
+    return bytes(header) + compressed_data
+
+def create_idx(item):
+    if os.path.exists(item):
+        with open(item, 'r', encoding='utf-8') as f:
+            content = f.read()
+            splits = re.split(r'\s*■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■\s*', content)
+            new_splits = [splits[0]]
+            delimiter = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□'
+            for split in splits[1:]:
+                if delimiter not in split:
+                    print(f'{item}——{split}：译文拆分失败！')
+                    sys.exit()
+                text = split.split(delimiter, 1)[1].strip()
+                if text == '':
+                    text = '　' #单空格情况实在是匹配不到，所以只能这样了
+                    
+                new_splits.append(text)        
+            f.close()
+            
+        return new_splits
+    else:
+        return None
+
+def tail_merge(strings):
+    """
+    尾部合并：一个字符串是另一个字符串的后缀时，直接指向较长字符串的尾部
+    strings 为编码后带结尾 \\0 的不重复字符串，返回 {字符串: 实际写入字符串池的那个字符串}
+    按反转后的内容排序，后缀反转后是前缀，会紧挨在包含它的字符串前面，所以倒序遍历时只需要和上一个比较
+    """
+    owners = {}
+    previous = None
+    for string in sorted(strings, key=lambda b: b[::-1], reverse=True):
+        if previous is not None and previous.endswith(string):
+            owners[string] = owners[previous]
+        else:
+            owners[string] = string
+        previous = string
+    return owners
+
+def load_texts(item):
+    """
+    读取一个脚本的描述文本、文本数和译文列表，没有文本时返回 None
+    """
+    if 数据库 is not None:
+        result = store.read_script(数据库, item)
+        if result is None:
+            return None
+        描述文本, 文本数, texts = result
+        return 描述文本, 文本数, [text.strip() or '　' for text in texts]
+
+    split = create_idx(f'{os.path.join(work_dir, item)}.txt')
+    if split is None:
+        return None
+    result = ((m := store.HEADER_PATTERN.search(split[0])) and (m.group(1), int(m.group(2))) or None)
+    if result is None:
+        print(f"{item}：未发现描述文本或文本数！")
+        sys.exit()
+    return result[0], result[1], split[1:]
+
+def pack_block_construct(item):
+    item_dir = os.path.join(work_dir, item)
+
+    with profiler.phase('load_texts'):
+        texts = load_texts(item)
+
+    if texts is None:
+        str1_data = bytes()
+        table2_data = bytes()
+        描述文本 = item      
+    else:
+        描述文本, 文本数, str_1_idx = texts
+        str_1_idx_current = len(str_1_idx)
+        
+        if 文本数 != str_1_idx_current:
+            print(f"{item}：文本数不匹配！\n应为{文本数} ！实则{str_1_idx_current}！")
+            sys.exit()
+    
+        with profiler.phase('string_pool'):
+            str_dict = {}
+            str1_data = bytearray()
+            entry_size = 格式.table_entry_size
+            table2_data = bytearray(str_1_idx_current * entry_size)
+            current_address = 0
+
+            for key in str_1_idx:
+                if key in str_dict:
+                        str_dict[key].append(current_address)
+                else:
+                        str_dict[key] = [current_address]
+                current_address += entry_size
+
+            encoded = {key: key.encode(编码, errors='ignore') + b'\x00' for key in str_dict}
+            if 尾部合并:
+                owners = tail_merge(set(encoded.values()))
+                pool_offsets = {}
+                for string_data in encoded.values():
+                    owner = owners[string_data]
+                    if owner not in pool_offsets:
+                        pool_offsets[owner] = len(str1_data)
+                        str1_data += owner
+
+            for key, addres in str_dict.items():
+                string_data = encoded[key]
+                string_len = len(string_data)
+                if 尾部合并:
+                    owner = owners[string_data]
+                    string_offset = pool_offsets[owner] + len(owner) - string_len
+                else:
+                    string_offset = len(str1_data)
+                    str1_data += string_data
+                for addr in addres:
+                    struct.pack_into('<I', table2_data, addr, string_offset)
+                    struct.pack_into('<I', table2_data, addr + 格式.string_length_at, string_len)
+
+    #    现在用的是优化逻辑，注释掉的是原本的构建逻辑
+    #    for string in str_1_idx:
+    #        string_data = string.encode(编码, errors='ignore') + b'\x00'
+    #        
+    #        struct.pack_into('<I', table2_data, current_address, len(str1_data))
+    #        struct.pack_into('<I', table2_data, current_address + 8, len(string_data))
+    #
+    #        str1_data += string_data
+    #        
+    #        current_address += 16
+
+    with profiler.phase('read_bin'):
+        if 分段容器 is not None and item in 分段容器 and not os.path.isdir(item_dir):
+            # 没有单独的目录时从容器里按偏移取出，有目录时以目录里的文件为准
+            try:
+                table1_data, table3_data, opcode_data, str2_data = (分段容器.read(item, section) for section in sections.SECTIONS)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+        else:
+            table1_data = raed_bin('table1.bin', item_dir)
+            table3_data = raed_bin('table3.bin', item_dir)
+            opcode_data = raed_bin('opcode.bin', item_dir)
+            str2_data = raed_bin('str2.bin', item_dir)
+
+    block = pack_block_compress(table1_data, table2_data, table3_data, opcode_data, str1_data, str2_data, 描述文本, item)
+
+    return block
+
+def list_items():
+    # 按编码后的文件名排序，不依赖文件系统返回的顺序，同样的输入总是得到同样的封包
+    # 每个子目录和段容器中的每个脚本各是一个脚本
+    with os.scandir(work_dir) as it:
+        items = {entry.name for entry in it if entry.is_dir()}
+    if 分段容器 is not None:
+        items.update(分段容器.names())
+    return sorted(items, key=lambda d: d.encode(编码, errors='ignore'))
+
+def assemble(blocks):
+    """
+    把按顺序的 (脚本名, 块数据) 拼成完整的封包（头部、压缩后的索引表、数据区），返回封包内容
+    blocks 可以是边压缩边产生的生成器；内容相同的块只写一次
+    """
+    count = 0
+    list = bytearray()
+    data = bytearray()
+    block_offsets = {} # 块内容的哈希 → 在数据区中的偏移，内容相同的块只写一次
+
+    for item, item_block in blocks:
+        item_name = item.encode(编码, errors='ignore')
+        block_hash = hashlib.sha1(item_block).digest()
+        if block_hash not in block_offsets:
+            block_offsets[block_hash] = len(data)
+            data.extend(item_block)
+        list += pakfmt.index_entry(格式, item_name, block_offsets[block_hash], len(item_block))
+        count += 1
+
+    with profiler.phase('index'):
+        list_compress = compress_block('<index>', list, 格式.index_xor)
+
+    header = pakfmt.archive_header(格式, list_compress, count)
+    header.extend(data)
+    return header
+
+def pack():
+    items = list_items()
+
+    with profiler.phase('validate'):
+        problems = validate.validate(work_dir, 编码, items, 数据库, name_max=格式.name_size)
+    if problems:
+        for problem in problems:
+            print(problem)
+        print(f'共 {len(problems)} 个问题，请修改后再打包')
+        sys.exit(1)
+
+    def build_blocks():
+        for i, item in enumerate(items):
+            with profiler.entry(item):
+                item_block = pack_block_construct(item)
+            print(f'{i}：{item}')
+            yield item, item_block
+
+    archive = assemble(build_blocks())
+    
+    with profiler.phase('write'), open(out_pack, 'wb') as f:
+        f.write(archive)
+        f.close()
+
+    if 构建报告 is not None:
+        write_report(报告路径)
+
+
+
+def main(layout=pakfmt.GSWSYS):
+    """命令行入口，layout 为默认的输出格式（Lilith/pack_Lilith.py 传入 DataPack5）"""
+    global 编码, work_dir, out_pack, 压缩级别, 尾部合并, 压缩统计, 构建报告, 报告路径, 数据库, 格式, 分段容器
+    编码 = 'cp936'
+    parser = argparse.ArgumentParser(description="把解包目录重新打包为 pak 封包。")
+    parser.add_argument("work_dir", help="unpack.py 的输出目录。")
+    parser.add_argument("out_pack", help="输出 pak 文件的路径。")
+    parser.add_argument("-f", "--format", choices=pakfmt.LAYOUTS, default=layout.key, help=f"输出封包的格式（默认: {layout.key}）。")
+    parser.add_argument("fast", nargs='?', help="随便输入一个值则不压缩（等同于 -l store）。")
+    parser.add_argument("-l", "--level", choices=LEVELS, default=压缩级别, help=f"压缩级别（默认: {压缩级别}）。")
+    parser.add_argument("--report", help="把每一块选择的压缩级别和压缩率写成 JSON 报告。")
+    parser.add_argument("--stats", action='store_true', help="在报告中加上每一块的文字/匹配数、匹配长度和距离分布（需要 --report）。")
+    parser.add_argument("--tail-merge", action='store_true', help="字符串池中是其他字符串后缀的字符串不再单独保存。")
+    parser.add_argument("--source", help="原版 pak 文件。内容没有变化的块直接复制原来的压缩数据，不再压缩。")
+    parser.add_argument("--db", help="从这个 SQLite 数据库（见 store.py）读取文本，代替txt文件。")
+    parser.add_argument("--profile", nargs='?', const='profile.json', help="记录每个阶段和每个脚本的耗时、内存峰值，写成 JSON 报告（默认: profile.json）。")
+    parser.add_argument("--profile-top", type=int, default=10, help="性能分析中列出最慢的几个脚本（默认: 10）。")
+    args = parser.parse_args()
+
+    格式 = pakfmt.LAYOUTS[args.format]
+    work_dir = args.work_dir
+    out_pack = args.out_pack
+    分段容器 = sections.open_container(work_dir)
+    压缩级别 = 'store' if args.fast is not None else args.level
+    尾部合并 = args.tail_merge
+    if args.stats and not args.report:
+        parser.error('--stats 需要同时指定 --report')
+    压缩统计 = args.stats
+    if args.report:
+        构建报告 = []
+        报告路径 = args.report
+    if args.db:
+        if not os.path.exists(args.db):
+            print(f"错误：未找到数据库 '{args.db}'")
+            sys.exit(1)
+        数据库 = store.open_store(args.db)
+    if args.source:
+        load_source(args.source)
+    if args.profile:
+        profiler.enable()
+    pack()
+    profiler.finish(args.profile, args.profile_top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import struct
+
+# 两个游戏的封包格式：GswSys PACK 2.0 和 Lilith 的 DataPack5
+# 两者结构相同，只是头部、索引表每项、SCW 头部的大小和字段位置不同，索引表是否异或加密也不同
+# 每种格式用一个布局（Layout）描述，读写封包、索引表、SCW 头部和解压的代码只写一份，
+# pack.py / unpack.py / png.py 按布局处理，Lilith 目录下的脚本只是换了布局的入口
+#
+# 索引表和 SCW 块都用同一种 LZSS 压缩：4096 字节的环形窗口，初始全是 0，写入位置从 0xfee 开始；
+# 每个标志字节的 8 位从低到高，1 为 1 字节文字，0 为 2 字节匹配（12 位窗口偏移 + 4 位长度-3）
+# SCW 块的压缩数据（和 PACK 2.0 的索引表）再按 (i & 0xff) 异或
+
+SCW_FIELDS = ('compressed_size', 'raw_size', 'table1', 'table2', 'table3', 'opcode', 'str1', 'str2')
+DESCRIPTION_MAX = 0x2C # 描述文本的最大字节数，两种格式相同
+
+class Layout:
+    """
+    一种封包格式的布局
+      key / name / magic: 命令行里的名字、显示的名字、文件开头的标识（用来识别格式）
+      header: 封包头部模板，固定字段已经填好
+      index_size_at / count_at / data_offset_at: 头部中压缩后索引表大小、文件数、数据区起始位置的位置
+      index_offset_at: 头部中索引表位置的位置，None 表示索引表紧跟在头部后面
+      index_xor: 索引表是否异或加密
+      entry_size / name_size / entry_tail: 索引表每项的大小、文件名的最大字节数（文件名后面依次是相对偏移和大小）、
+                                           偏移和大小之后固定写入的内容
+      scw_header / scw_constants / scw_fields / scw_description_at: SCW 头部模板、模板中固定字段的位置、
+                                                                  SCW_FIELDS 各字段的位置、描述文本的位置
+      scw_magic: SCW 头部开头的标识，用来区分脚本封包和图片封包
+      table_entry_size / string_length_at: table1/2/3 每项的大小（SCW 头部中记录项数），table2 每项中字符串长度的位置
+      name_encoding: 索引表中文件名的编码
+      image_header / image_fields / image_multi: 图片块头部大小；压缩大小、宽、高、位深、数据偏移在头部（按 4 字节计）中的序号，
+                                                  数据偏移为 None 表示数据紧跟在头部后面；一个文件里是否有多个图片块
+    """
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __repr__(self):
+        return f'<Layout {self.name}>'
+
+def _template(size, *fields):
+    """fields 为 (位置, struct 格式, 值)，返回填好这些字段的模板"""
+    data = bytearray(size)
+    for offset, fmt, value in fields:
+        struct.pack_into(fmt, data, offset, value)
+    return bytes(data)
+
+GSWSYS = Layout(
+    key='gsw', name='GswSys PACK 2.0', magic=b'GswSys PACK 2.0',
+    header=_template(0x1C, (0, '15s', b'GswSys PACK 2.0')),
+    index_size_at=0x10, count_at=0x14, data_offset_at=0x18, index_offset_at=None, index_xor=True,
+    entry_size=0x28, name_size=0x20, entry_tail=b'',
+    scw_header=_template(0xC8, (0, '14s', b'SCW for GswSys'), (0x10, '<I', 0x3000003), (0x14, '<I', 0xFFFFFFFF),
+                         (0x24, '<I', 1)),
+    scw_constants=(0x10, 0x14, 0x24), scw_magic=b'SCW for GswSys',
+    scw_fields=dict(zip(SCW_FIELDS, (0x18, 0x1C, 0x28, 0x2C, 0x30, 0x34, 0x38, 0x3C))),
+    scw_description_at=0x88,
+    table_entry_size=16, string_length_at=8,
+    name_encoding='shift-jis',
+    image_header=40, image_fields=(0, 4, 5, 6, None), image_multi=False,
+)
+
+DATAPACK5 = Layout(
+    key='datapack5', name='DataPack5', magic=b'DataPack5',
+    header=_template(0x48, (0, '9s', b'DataPack5'), (0x10, '6s', b'LILITH'), (0x30, '<H', 1), (0x32, '<H', 5)),
+    index_size_at=0x34, count_at=0x3C, data_offset_at=0x40, index_offset_at=0x44, index_xor=False,
+    entry_size=0x68, name_size=0x40, entry_tail=struct.pack('<II', 1, 1),
+    scw_header=_template(0x1C8, (0, '6s', b'Scw5.x'), (0x13, 'B', 5), (0x14, '<I', 0xFFFFFFFF), (0x20, '<I', 1)),
+    scw_constants=(0x14, 0x20), scw_magic=b'Scw5.x',
+    scw_fields=dict(zip(SCW_FIELDS, (0x1C, 0x18, 0x24, 0x28, 0x2C, 0x30, 0x34, 0x38))),
+    scw_description_at=0xC8,
+    table_entry_size=8, string_length_at=4,
+    name_encoding='cp936',
+    image_header=0x74, image_fields=(1, 5, 6, 7, 3), image_multi=True,
+)
+
+LAYOUTS = {layout.key: layout for layout in (GSWSYS, DATAPACK5)}
+MAX_HEADER = max(len(layout.header) for layout in LAYOUTS.values())
+
+# --- 异或和解压 ---
+
+_XOR_KEY = bytes(range(256))
+CHUNK_SIZE = 0x10000 # 分段读取、解压时每段输入的大小
+
+def xor(data, key_byte=0xff, start=0):
+    """
+    按 (i & key_byte) 异或，加密和解密相同；密钥每 256 字节重复，拼成和数据一样长后当作大整数一次异或
+    start 为 data 第一个字节在整段数据中的位置，分段处理时密钥接着上一段
+    """
+    n = len(data)
+    key = _XOR_KEY if key_byte == 0xff else bytes(i & key_byte for i in range(256))
+    start &= 0xff
+    key = (key[start:] + key[:start]) * (n // 256 + 1)
+    return bytearray((int.from_bytes(data, 'little') ^ int.from_bytes(key[:n], 'little')).to_bytes(n, 'little'))
+
+class Decompressor:
+    """
+    增量 LZSS 解压（数据需要先解密）：每次 feed 一段输入，返回这一段能解出的数据
+    段与段之间只保留 4 KiB 窗口、写入位置、当前的标志位和上一段末尾没凑齐的半个匹配（最多 1 字节），
+    所以不管文件多大，占用的内存只和每段的大小有关
+    不跨过窗口末尾、也不与正在写入的位置重叠的匹配整段复制，其余的逐字节复制
+    """
+    __slots__ = ('window', 'pos', 'flags', 'pending')
+
+    def __init__(self):
+        self.window = bytearray(0x1000)
+        self.pos = 0xfee
+        self.flags = 0
+        self.pending = b''
+
+    def feed(self, chunk):
+        data = self.pending + bytes(chunk) if self.pending else chunk
+        n = len(data)
+        window = self.window
+        pos = self.pos
+        flags = self.flags
+        output = bytearray()
+        i = 0
+        while True:
+            flags >>= 1
+            if not flags & 0x100:
+                if i >= n:
+                    break
+                flags = 0xff00 | data[i]
+                i += 1
+            if flags & 1:
+                if i >= n:
+                    break
+                byte = data[i]
+                i += 1
+                output.append(byte)
+                window[pos] = byte
+                pos = (pos + 1) & 0xfff
+            else:
+                if i + 1 >= n:
+                    break
+                b1, b2 = data[i], data[i + 1]
+                i += 2
+                offset = b1 | ((b2 & 0xf0) << 4)
+                length = (b2 & 0x0f) + 3
+                if offset + length <= 0x1000 and pos + length <= 0x1000 and not offset < pos < offset + length:
+                    chunk = window[offset:offset + length]
+                    output += chunk
+                    window[pos:pos + length] = chunk
+                    pos = (pos + length) & 0xfff
+                else:
+                    for _ in range(length):
+                        byte = window[offset]
+                        output.append(byte)
+                        window[pos] = byte
+                        offset = (offset + 1) & 0xfff
+                        pos = (pos + 1) & 0xfff
+        # 停下来的这个标志位还没有用掉，下一段开头会再右移一次，所以先左移回去
+        self.flags = flags << 1
+        self.pending = bytes(data[i:])
+        self.pos = pos
+        return output
+
+def decompress(data, limit=None):
+    """一次解压整段数据，limit 为只使用前 limit 字节输入（图片块的压缩大小），默认全部"""
+    if limit is not None and limit < len(data):
+        data = memoryview(data)[:limit]
+    return Decompressor().feed(data)
+
+# --- 封包头部和索引表 ---
+
+def detect(head):
+    """按文件开头的标识返回布局，不认识时返回 None"""
+    for layout in LAYOUTS.values():
+        if bytes(head[:len(layout.magic)]) == layout.magic:
+            return layout
+    return None
+
+def read_header(f):
+    """
+    读取封包头部，返回 (布局, 压缩后索引表大小, 文件数, 数据区起始位置, 索引表位置)
+    不认识的格式或文件过小时抛出 ValueError
+    """
+    f.seek(0)
+    head = f.read(MAX_HEADER)
+    layout = detect(head)
+    if layout is None:
+        raise ValueError('不是 GswSys PACK 2.0 或 DataPack5 封包。')
+    if len(head) < len(layout.header):
+        raise ValueError('文件过小，无法读取完整的 pak 主头部。')
+    index_size, = struct.unpack_from('<I', head, layout.index_size_at)
+    count, = struct.unpack_from('<I', head, layout.count_at)
+    data_offset, = struct.unpack_from('<I', head, layout.data_offset_at)
+    if layout.index_offset_at is None:
+        index_offset = len(layout.header)
+    else:
+        index_offset, = struct.unpack_from('<I', head, layout.index_offset_at)
+    return layout, index_size, count, data_offset, index_offset
+
+def parse_index(layout, index, count):
+    """用 struct.iter_unpack 一次解析解压后的索引表，返回 [(文件名字节, 相对偏移, 大小), ...]，索引表不完整时只返回完整的项"""
+    count = min(count, len(index) // layout.entry_size)
+    fmt = f'<{layout.name_size}sII{layout.entry_size - layout.name_size - 8}x'
+    return [(name.split(b'\x00', 1)[0], offset, size)
+            for name, offset, size in struct.iter_unpack(fmt, memoryview(index)[:count * layout.entry_size])]
+
+def read_index(f):
+    """
+    读取并解压封包的索引表，返回 (布局, 数据区起始位置, 文件数, [(文件名字节, 相对偏移, 大小), ...])
+    文件数为头部中记录的数量，索引表损坏时可能比列表长
+    """
+    layout, index_size, count, data_offset, index_offset = read_header(f)
+    f.seek(index_offset)
+    compressed = f.read(index_size)
+    if len(compressed) < index_size:
+        raise ValueError('读取压缩索引表数据时文件提前结束。')
+    index = decompress(xor(compressed) if layout.index_xor else compressed)
+    return layout, data_offset, count, parse_index(layout, index, count)
+
+def archive_kind(f, layout, data_offset, entries):
+    """
+    看第一个非空文件的开头判断封包里是脚本（SCW 块）还是图片，返回 'script' / 'image'，没有非空文件时返回 None
+    entries 为 read_index 返回的索引表
+    """
+    for _, offset, size in entries:
+        if size:
+            f.seek(data_offset + offset)
+            head = f.read(len(layout.scw_magic))
+            return 'script' if head == layout.scw_magic else 'image'
+    return None
+
+def index_entry(layout, name, offset, size):
+    """索引表的一项，name 为编码后的文件名"""
+    entry = bytearray(layout.entry_size)
+    entry[:len(name)] = name
+    struct.pack_into('<II', entry, layout.name_size, offset, size)
+    tail = layout.name_size + 8
+    entry[tail:tail + len(layout.entry_tail)] = layout.entry_tail
+    return entry
+
+def archive_header(layout, compressed_index, count):
+    """封包头部加上压缩（和加密）后的索引表，数据区紧跟在后面"""
+    header = bytearray(layout.header)
+    struct.pack_into('<I', header, layout.index_size_at, len(compressed_index))
+    struct.pack_into('<I', header, layout.count_at, count)
+    if layout.index_offset_at is not None:
+        struct.pack_into('<I', header, layout.index_offset_at, len(header))
+    header += compressed_index
+    struct.pack_into('<I', header, layout.data_offset_at, len(header))
+    return header
+
+# --- SCW 头部 ---
+
+def scw_header(layout, values, description):
+    """按布局生成 SCW 头部，values 为 {SCW_FIELDS 中的字段: 值}（table1/2/3 为项数），description 为编码后的描述文本"""
+    header = bytearray(layout.scw_header)
+    for field, value in values.items():
+        struct.pack_into('<I', header, layout.scw_fields[field], value)
+    header[layout.scw_description_at:layout.scw_description_at + len(description)] = description
+    return header
+
+def parse_scw_header(layout, header):
+    """返回 {SCW_FIELDS 中的字段: 值}，另外 'description' 为描述文本所在区域的原始字节（到 SCW 头部末尾，含结尾的 0）"""
+    values = {field: struct.unpack_from('<I', header, offset)[0] for field, offset in layout.scw_fields.items()}
+    values['description'] = bytes(header[layout.scw_description_at:len(layout.scw_header)])
+    return values
+
+def scw_sections(layout, values):
+    """按 SCW 头部的字段计算解压后数据中各段的 (起点, 终点)，顺序为 table1、table2、table3、opcode、str1、str2"""
+    sections = {}
+    start = 0
+    for field in SCW_FIELDS[2:]:
+        size = values[field] * layout.table_entry_size if field.startswith('table') else values[field]
+        sections[field] = (start, start + size)
+        start += size
+    return sections
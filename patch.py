@@ -0,0 +1,182 @@
+import os
+import sys
+import struct
+import hashlib
+import argparse
+
+import unpack
+
+# 补丁格式：
+#   PATCH_MAGIC、原封包 SHA-1、目标封包 SHA-1、目标封包大小（<Q）
+#   之后是一串操作，按顺序拼出目标封包：
+#     OP_COPY <QQ 原封包中的偏移和长度，直接从原封包复制
+#     OP_DATA <Q  长度，后面跟着这么多字节的新数据
+#     OP_END
+PATCH_MAGIC = b'YAMIPAT1'
+OP_COPY = 0
+OP_DATA = 1
+OP_END = 0xFF
+CHUNK_SIZE = 1 << 20
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.digest()
+
+def read_blocks(f):
+    """读取封包索引，返回 [(绝对偏移, 大小), ...]（按偏移排序、去重）和数据区起始位置"""
+    data_offset, files_info = unpack.read_pak_index(f)
+    blocks = sorted({(data_offset + info['relative_offset'], info['uncompressed_size_index']) for info in files_info})
+    return data_offset, blocks
+
+def plan_patch(original_path, target_path):
+    """
+    比较两个封包，返回拼出目标封包的操作列表 [('copy', 偏移, 长度) | ('data', 偏移, 长度), ...]
+    data 的偏移是目标封包中的位置；相邻的 copy 如果在原封包中也相邻，会合并成一次
+    """
+    original_blocks = {}
+    with open(original_path, 'rb') as f:
+        _, blocks = read_blocks(f)
+        for offset, size in blocks:
+            f.seek(offset)
+            original_blocks.setdefault(hashlib.sha1(f.read(size)).digest(), (offset, size))
+
+    ops = []
+    def add(op):
+        if ops and ops[-1][0] == op[0]:
+            last = ops[-1]
+            if op[0] == 'copy' and last[1] + last[2] == op[1]:
+                ops[-1] = ('copy', last[1], last[2] + op[2])
+                return
+            if op[0] == 'data':
+                ops[-1] = ('data', last[1], last[2] + op[2])
+                return
+        ops.append(op)
+
+    target_size = os.path.getsize(target_path)
+    with open(target_path, 'rb') as f:
+        data_offset, blocks = read_blocks(f)
+        position = 0
+        for offset, size in blocks:
+            if offset < position:
+                continue # 与前一块重叠，前一块已经覆盖
+            if offset > position:
+                add(('data', position, offset - position)) # 头部、索引表或块之间的空隙
+            f.seek(offset)
+            source = original_blocks.get(hashlib.sha1(f.read(size)).digest())
+            if source is not None and source[1] == size:
+                add(('copy', source[0], size))
+            else:
+                add(('data', offset, size))
+            position = offset + size
+        if position < target_size:
+            add(('data', position, target_size - position))
+    return ops
+
+def make_patch(original_path, target_path, patch_path):
+    """生成补丁，返回 (复制的字节数, 补丁中新数据的字节数)"""
+    ops = plan_patch(original_path, target_path)
+    copied = written = 0
+    with open(target_path, 'rb') as target, open(patch_path, 'wb') as out:
+        out.write(PATCH_MAGIC)
+        out.write(file_sha1(original_path))
+        out.write(file_sha1(target_path))
+        out.write(struct.pack('<Q', os.path.getsize(target_path)))
+        for kind, offset, length in ops:
+            if kind == 'copy':
+                out.write(struct.pack('<BQQ', OP_COPY, offset, length))
+                copied += length
+                continue
+            out.write(struct.pack('<BQ', OP_DATA, length))
+            target.seek(offset)
+            remaining = length
+            while remaining:
+                chunk = target.read(min(CHUNK_SIZE, remaining))
+                out.write(chunk)
+                remaining -= len(chunk)
+            written += length
+        out.write(struct.pack('<B', OP_END))
+    return copied, written
+
+def _copy(src, dst, length, h):
+    while length:
+        chunk = src.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            raise ValueError('补丁或原封包数据不完整')
+        dst.write(chunk)
+        h.update(chunk)
+        length -= len(chunk)
+
+def _read_exact(f, n):
+    """从补丁中读取 n 字节，不够时说明补丁被截断"""
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError('补丁不完整')
+    return data
+
+def apply_patch(original_path, patch_path, output_path, verify=True):
+    """用原封包和补丁拼出目标封包，先写到临时文件，校验通过后再改名；出错时删除临时文件"""
+    with open(patch_path, 'rb') as patch:
+        if patch.read(len(PATCH_MAGIC)) != PATCH_MAGIC:
+            raise ValueError('不是补丁文件')
+        original_sha1 = _read_exact(patch, 20)
+        target_sha1 = _read_exact(patch, 20)
+        target_size = struct.unpack('<Q', _read_exact(patch, 8))[0]
+        if verify and file_sha1(original_path) != original_sha1:
+            raise ValueError('原封包与生成补丁时使用的不一致')
+
+        temp_path = output_path + '.tmp'
+        h = hashlib.sha1()
+        try:
+            with open(original_path, 'rb') as original, open(temp_path, 'wb') as out:
+                while True:
+                    op = _read_exact(patch, 1)[0]
+                    if op == OP_END:
+                        break
+                    if op == OP_COPY:
+                        offset, length = struct.unpack('<QQ', _read_exact(patch, 16))
+                        original.seek(offset)
+                        _copy(original, out, length, h)
+                    elif op == OP_DATA:
+                        length = struct.unpack('<Q', _read_exact(patch, 8))[0]
+                        _copy(patch, out, length, h)
+                    else:
+                        raise ValueError(f'未知的补丁操作：{op}')
+                size = out.tell()
+            if size != target_size or h.digest() != target_sha1:
+                raise ValueError('生成的封包校验失败')
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    os.replace(temp_path, output_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="生成或应用 pak 封包的差分补丁。")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('make', help='比较原封包和新封包，生成补丁')
+    p.add_argument('original')
+    p.add_argument('target')
+    p.add_argument('patch')
+    p = sub.add_parser('apply', help='用原封包和补丁生成新封包')
+    p.add_argument('original')
+    p.add_argument('patch')
+    p.add_argument('output')
+    p.add_argument('--no-verify', action='store_true', help='不校验原封包（省去读一遍原封包）')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'make':
+            copied, written = make_patch(args.original, args.target, args.patch)
+            print(f'补丁已生成：{os.path.getsize(args.patch)} 字节（复用原封包 {copied} 字节，新数据 {written} 字节）')
+        else:
+            apply_patch(args.original, args.patch, args.output, not args.no_verify)
+            print(f'已生成 {args.output}')
+    except (OSError, ValueError) as e:
+        print(f'错误：{e}')
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
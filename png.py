@@ -1,127 +1,153 @@
-#!/usr/bin/env python3
-import struct
-import sys
-from pathlib import Path
-import numpy as np
-from PIL import Image
-
-
-class LzssDecompressor:
-    __slots__ = ('data', 'size')
-    
-    def __init__(self, data: bytes):
-        self.data = data
-        self.size = len(data)
-    
-    def decompress(self, comp_size: int) -> bytes:
-        data, limit = self.data, min(comp_size, self.size)
-        window, pos, output = bytearray(0x1000), 0xfee, bytearray()
-        i, flags = 0, 0
-        
-        while i < limit:
-            flags >>= 1
-            if not (flags & 0x100):
-                if i >= limit: break
-                flags = 0xff00 | data[i]
-                i += 1
-            
-            if flags & 1:
-                if i >= limit: break
-                byte = data[i]
-                i += 1
-                output.append(byte)
-                window[pos] = byte
-                pos = (pos + 1) & 0xfff
-            else:
-                if i + 1 >= limit: break
-                b1, b2 = data[i], data[i + 1]
-                i += 2
-                offset, length = b1 | ((b2 & 0xf0) << 4), (b2 & 0x0f) + 3
-                for _ in range(length):
-                    byte = window[offset & 0xfff]
-                    output.append(byte)
-                    window[pos] = byte
-                    offset += 1
-                    pos = (pos + 1) & 0xfff
-        
-        return bytes(output)
-
-
-class PakExtractor:
-    def __init__(self, pak_path: str):
-        self.pak_path = pak_path
-    
-    def _xor_decrypt(self, data: bytes) -> bytes:
-        arr = np.frombuffer(data, dtype=np.uint8).copy()
-        arr ^= np.arange(len(arr), dtype=np.uint8)
-        return bytes(arr)
-    
-    def _read_index(self, f) -> list:
-        header = f.read(0x1c)
-        index_size, file_count, data_offset = struct.unpack('<III', header[0x10:0x1c])
-        compressed = f.read(index_size)
-        index_data = LzssDecompressor(self._xor_decrypt(compressed)).decompress(index_size)
-        
-        files = []
-        for i in range(file_count):
-            entry = index_data[i * 0x28:(i + 1) * 0x28]
-            name = entry[:0x20].split(b'\x00')[0].decode('shift-jis', errors='ignore')
-            rel_offset, size = struct.unpack('<II', entry[0x20:0x28])
-            files.append({'name': name, 'offset': data_offset + rel_offset, 'size': size})
-        return files
-    
-    def _decode_image(self, data: bytes) -> Image.Image:
-        header = struct.unpack('<10I', data[:40])
-        comp_size, w, h, bpp = header[0], header[4], header[5], header[6]
-        
-        raw = data[40:]
-        pixels = LzssDecompressor(raw).decompress(comp_size) if comp_size else raw
-        
-        if bpp == 8:
-            pal = np.frombuffer(pixels[:1024], dtype=np.uint8).reshape(256, 4)
-            idx = np.frombuffer(pixels[1024:1024 + w * h], dtype=np.uint8).reshape(h, w)
-            bgra = pal[idx]
-            if np.all(bgra[:, :, 3] == 0):
-                return Image.fromarray(bgra[:, :, [2, 1, 0]], 'RGB')
-            return Image.fromarray(bgra[:, :, [2, 1, 0, 3]], 'RGBA')
-        elif bpp == 24:
-            bgr = np.frombuffer(pixels[:w * h * 3], dtype=np.uint8).reshape(h, w, 3)
-            return Image.fromarray(bgr[:, :, ::-1], 'RGB')
-        elif bpp == 32:
-            bgra = np.frombuffer(pixels[:w * h * 4], dtype=np.uint8).reshape(h, w, 4)
-            if np.all(bgra[:, :, 3] == 0):
-                return Image.fromarray(bgra[:, :, [2, 1, 0]], 'RGB')
-            return Image.fromarray(bgra[:, :, [2, 1, 0, 3]], 'RGBA')
-        
-        raise ValueError(f"bpp={bpp}")
-    
-    def extract_all(self, output_dir: str):
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        with open(self.pak_path, 'rb') as f:
-            files = self._read_index(f)
-            ok, fail = 0, 0
-            
-            for i, info in enumerate(files, 1):
-                print(f"[{i}/{len(files)}] {info['name']}", end=' ... ')
-                try:
-                    f.seek(info['offset'])
-                    img = self._decode_image(f.read(info['size']))
-                    out_file = output_path / f"{info['name']}.png"
-                    out_file.parent.mkdir(parents=True, exist_ok=True)
-                    img.save(out_file)
-                    print(f"✓ {img.size[0]}x{img.size[1]} {img.mode}")
-                    ok += 1
-                except Exception as e:
-                    print(f"✗ {e}")
-                    fail += 1
-            
-            print(f"\n完成: {ok} 成功, {fail} 失败")
-
-
-if __name__ == '__main__':
-    if len(sys.argv) < 3:
-        print("用法: python extract.py <PAK文件> <输出目录>")
-        sys.exit(1)
-    PakExtractor(sys.argv[1]).extract_all(sys.argv[2])
\ No newline at end of file
+#!/usr/bin/env python3
+import struct
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+import profiler
+import pakfmt
+
+
+class PakExtractor:
+    """按文件开头的标识自动识别 PACK 2.0 / DataPack5，图片块的位置和字段见 pakfmt 中的布局"""
+    def __init__(self, pak_path: str):
+        self.pak_path = pak_path
+        self.layout = None
+    
+    def _read_index(self, f) -> list:
+        layout, data_offset, _, entries = pakfmt.read_index(f)
+        self.layout = layout
+        return [{'name': name.decode(layout.name_encoding, errors='ignore'), 'offset': data_offset + rel_offset, 'size': size}
+                for name, rel_offset, size in entries]
+    
+    def _image_blocks(self, data: bytes):
+        """依次产生 (压缩大小, 宽, 高, 位深, 数据)，压缩大小为 0 表示数据未压缩"""
+        layout = self.layout
+        comp_i, w_i, h_i, bpp_i, offset_i = layout.image_fields
+        header_size = layout.image_header
+        offset = 0
+        while offset + header_size <= len(data):
+            header = struct.unpack_from(f'<{header_size // 4}I', data, offset)
+            data_start = offset + (header_size if offset_i is None else header[offset_i])
+            comp_size = header[comp_i]
+            if not layout.image_multi:
+                yield comp_size, header[w_i], header[h_i], header[bpp_i], data[data_start:]
+                return
+            if data_start + comp_size > len(data):
+                break
+            yield comp_size, header[w_i], header[h_i], header[bpp_i], data[data_start:data_start + comp_size]
+            # 下一块 4 字节对齐
+            offset = (data_start + comp_size + 3) & ~3
+    
+    def _decode_image(self, pixels: bytes, w: int, h: int, bpp: int) -> Image.Image:
+        if bpp == 8:
+            pal = np.frombuffer(pixels[:1024], dtype=np.uint8).reshape(256, 4)
+            idx = np.frombuffer(pixels[1024:1024 + w * h], dtype=np.uint8).reshape(h, w)
+            bgra = pal[idx]
+            if np.all(bgra[:, :, 3] == 0):
+                return Image.fromarray(bgra[:, :, [2, 1, 0]], 'RGB')
+            return Image.fromarray(bgra[:, :, [2, 1, 0, 3]], 'RGBA')
+        elif bpp == 24:
+            bgr = np.frombuffer(pixels[:w * h * 3], dtype=np.uint8).reshape(h, w, 3)
+            return Image.fromarray(bgr[:, :, ::-1], 'RGB')
+        elif bpp == 32:
+            bgra = np.frombuffer(pixels[:w * h * 4], dtype=np.uint8).reshape(h, w, 4)
+            if np.all(bgra[:, :, 3] == 0):
+                return Image.fromarray(bgra[:, :, [2, 1, 0]], 'RGB')
+            return Image.fromarray(bgra[:, :, [2, 1, 0, 3]], 'RGBA')
+        
+        raise ValueError(f"bpp={bpp}")
+    
+    def _extract_images(self, data: bytes) -> list:
+        """
+        解出一个文件里的全部图片
+        PACK 2.0 每个文件只有一张图片，出错时直接抛出；DataPack5 有多个图片块，解不出的块跳过
+        """
+        images = []
+        for comp_size, w, h, bpp, raw in self._image_blocks(data):
+            with profiler.phase('decompress'):
+                pixels = pakfmt.decompress(raw, comp_size) if comp_size else raw
+            try:
+                with profiler.phase('decode'):
+                    img = self._decode_image(pixels, w, h, bpp)
+            except Exception:
+                if not self.layout.image_multi:
+                    raise
+                continue
+            images.append({'image': img, 'index': len(images), 'size': f"{w}x{h}"})
+        return images
+    
+    def extract_entry(self, f, info: dict, output_path: Path) -> tuple:
+        """
+        解出索引表中的一项并保存，返回 (结果, 说明)
+        结果为 'ok' / 'empty'（没有图片）/ 'fail'，说明为要打印的一行文字
+        """
+        try:
+            with profiler.entry(info['name']):
+                with profiler.phase('read'):
+                    f.seek(info['offset'])
+                    data = f.read(info['size'])
+                images = self._extract_images(data)
+            
+                if not images:
+                    return 'empty', "- 无图像"
+            
+                if len(images) == 1:
+                    out_file = output_path / f"{info['name']}.png"
+                    out_file.parent.mkdir(parents=True, exist_ok=True)
+                    with profiler.phase('save'):
+                        images[0]['image'].save(out_file)
+                    return 'ok', f"✓ {images[0]['size']} {images[0]['image'].mode}"
+                
+                sub_dir = output_path / info['name']
+                sub_dir.mkdir(parents=True, exist_ok=True)
+                for img_data in images:
+                    out_file = sub_dir / f"{img_data['index']:03d}_{img_data['size']}.png"
+                    with profiler.phase('save'):
+                        img_data['image'].save(out_file)
+                return 'ok', f"✓ {len(images)} 图像"
+        except Exception as e:
+            return 'fail', f"✗ {e}"
+    
+    def extract_all(self, output_dir: str):
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        with open(self.pak_path, 'rb') as f:
+            with profiler.phase('index'):
+                files = self._read_index(f)
+            ok, fail = 0, 0
+            
+            for i, info in enumerate(files, 1):
+                print(f"[{i}/{len(files)}] {info['name']}", end=' ... ')
+                result, message = self.extract_entry(f, info, output_path)
+                print(message)
+                if result == 'ok':
+                    ok += 1
+                elif result == 'fail':
+                    fail += 1
+            
+            print(f"\n完成: {ok} 成功, {fail} 失败")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从 PACK 2.0 / DataPack5 图片封包中提取 PNG（按文件开头自动识别格式）。")
+    parser.add_argument("pak", help="PAK文件")
+    parser.add_argument("output_dir", help="输出目录")
+    parser.add_argument("--profile", nargs='?', const='profile.json', help="记录每个阶段和每张图片的耗时、内存峰值，写成 JSON 报告（默认: profile.json）。")
+    parser.add_argument("--profile-top", type=int, default=10, help="性能分析中列出最慢的几张图片（默认: 10）。")
+    args = parser.parse_args()
+    if args.profile:
+        profiler.enable()
+    try:
+        PakExtractor(args.pak).extract_all(args.output_dir)
+    except ValueError as e:
+        print(f"错误：{e}")
+        sys.exit(1)
+    profiler.finish(args.profile, args.profile_top)
+
+
+if __name__ == '__main__':
+    main()
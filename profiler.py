@@ -0,0 +1,170 @@
+import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+# 按阶段和条目记录耗时和内存峰值（pack.py / unpack.py / png.py 的 --profile）
+# 阶段可以嵌套：seconds 包含子阶段，self_seconds 去掉了子阶段；peak_bytes 是阶段内 tracemalloc 峰值比开始时多出的部分
+# 条目（每个脚本/图片）另外记录各阶段在这个条目里花的时间
+# 没有启用时 phase() / entry() 返回空的上下文管理器，几乎没有开销
+#
+# 挂自己的计时器：
+#   profiler.add_hook(hook)
+#   hook(事件, 类型, 名称, 记录)：事件为 'start' / 'end'，类型为 'phase' / 'entry'，
+#   'start' 时记录为 None，'end' 时为 {'seconds', 'self_seconds', 'peak_bytes'}
+
+_NULL = nullcontext()
+_profiler = None
+
+class _Span:
+    __slots__ = ('profiler', 'kind', 'name', 'start', 'children', 'peak', 'base', 'phases')
+
+    def __init__(self, profiler, kind, name):
+        self.profiler = profiler
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self)
+        return False
+
+class Profiler:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = {}   # 名称 → {'calls', 'seconds', 'self_seconds', 'peak_bytes'}
+        self.entries = []  # [{'name', 'seconds', 'peak_bytes', 'phases': {名称: 秒}}]
+        self.hooks = []
+        self._stack = []
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        return _Span(self, 'phase', name)
+
+    def entry(self, name):
+        return _Span(self, 'entry', name)
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _enter(self, span):
+        for hook in self.hooks:
+            hook('start', span.kind, span.name, None)
+        span.children = 0.0
+        span.peak = span.base = 0
+        span.phases = {} if span.kind == 'entry' else None
+        if self.trace_memory:
+            # reset_peak 会清掉外层阶段到目前为止的峰值，先记到外层
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            span.base = current
+        self._stack.append(span)
+        span.start = time.perf_counter()
+
+    def _exit(self, span):
+        seconds = time.perf_counter() - span.start
+        self._stack.pop()
+        peak = 0
+        if self.trace_memory:
+            peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            peak = max(0, peak - span.base)
+        if self._stack:
+            self._stack[-1].children += seconds
+        record = {'seconds': seconds, 'self_seconds': seconds - span.children, 'peak_bytes': peak}
+
+        if span.kind == 'entry':
+            self.entries.append({'name': span.name, 'seconds': seconds, 'peak_bytes': peak, 'phases': span.phases})
+        else:
+            stats = self.phases.setdefault(span.name, {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0, 'peak_bytes': 0})
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['self_seconds'] += record['self_seconds']
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+            for outer in reversed(self._stack):
+                if outer.kind == 'entry':
+                    outer.phases[span.name] = outer.phases.get(span.name, 0.0) + record['self_seconds']
+                    break
+
+        for hook in self.hooks:
+            hook('end', span.kind, span.name, record)
+
+    def report(self, top=10):
+        total = time.perf_counter() - self.started
+        phases = dict(sorted(self.phases.items(), key=lambda item: -item[1]['self_seconds']))
+        return {
+            'total_seconds': total,
+            'tracemalloc': self.trace_memory,
+            'phases': phases,
+            'slowest_entries': sorted(self.entries, key=lambda entry: -entry['seconds'])[:top],
+            'entries': self.entries,
+        }
+
+    def write_report(self, path, top=10):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(top), f, ensure_ascii=False, indent=2)
+
+    def print_summary(self, top=10):
+        report = self.report(top)
+        print(f"--- 性能分析（总计 {report['total_seconds']:.3f} 秒）---")
+        print(f"{'阶段':<16}{'次数':>8}{'总秒数':>10}{'自身秒数':>10}{'峰值内存':>12}")
+        for name, stats in report['phases'].items():
+            print(f"{name:<16}{stats['calls']:>8}{stats['seconds']:>10.3f}{stats['self_seconds']:>10.3f}"
+                  f"{stats['peak_bytes'] / 1024:>10.0f}KB")
+        if report['slowest_entries']:
+            print(f'最慢的 {len(report["slowest_entries"])} 项：')
+            for entry in report['slowest_entries']:
+                slowest_phase = max(entry['phases'].items(), key=lambda item: item[1], default=('-', 0))
+                print(f"  {entry['name']}  {entry['seconds']:.3f} 秒  峰值 {entry['peak_bytes'] / 1024:.0f}KB"
+                      f"  （主要在 {slowest_phase[0]}）")
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+def enable(trace_memory=True):
+    """开始记录，之后 phase() / entry() 都记到返回的 Profiler 里"""
+    global _profiler
+    _profiler = Profiler(trace_memory)
+    return _profiler
+
+def disable():
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _profiler = None
+
+def active():
+    return _profiler
+
+def phase(name):
+    return _NULL if _profiler is None else _profiler.phase(name)
+
+def entry(name):
+    return _NULL if _profiler is None else _profiler.entry(name)
+
+def add_hook(hook):
+    if _profiler is None:
+        raise RuntimeError('profiler 未启用')
+    _profiler.add_hook(hook)
+
+def finish(path=None, top=10):
+    """打印摘要，指定 path 时写 JSON 报告，然后停止记录"""
+    if _profiler is None:
+        return
+    _profiler.print_summary(top)
+    if path:
+        _profiler.write_report(path, top)
+        print(f'性能分析报告已写入 {path}')
+    disable()
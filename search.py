@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+from tojson import txt_to_entries
+
+# 对提取出的txt文件建立二元组（bigram）倒排索引，保存在 SQLite 数据库里
+# files: 已索引文件的修改时间和大小，用于增量更新
+# docs: 每一项的原文和译文，对应 (script, idx)，idx 与 tojson.py / store.py 一致，从 0 开始
+# grams: 二元组 → 包含它的项（原文和译文一起索引）
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    script TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    doc INTEGER PRIMARY KEY,
+    script TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_script ON docs (script);
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (gram, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS grams_doc ON grams (doc);
+'''
+
+DEFAULT_INDEX = 'search.db'
+MAX_QUERY_GRAMS = 64 # 查询串很长时只取一部分二元组求交集，剩下的由子串检查保证正确
+
+def open_index(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def list_scripts(directory):
+    """目录下所有txt文件，返回 {脚本名: 路径}，脚本名为去掉 .txt 的相对路径"""
+    scripts = {}
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith('.txt'):
+                path = os.path.join(root, filename)
+                script = os.path.relpath(path, directory)[:-4].replace(os.sep, '/')
+                scripts[script] = path
+    return scripts
+
+def _remove_script(conn, script):
+    conn.execute('DELETE FROM grams WHERE doc IN (SELECT doc FROM docs WHERE script = ?)', (script,))
+    conn.execute('DELETE FROM docs WHERE script = ?', (script,))
+    conn.execute('DELETE FROM files WHERE script = ?', (script,))
+
+def update_index(conn, directory):
+    """
+    增量更新索引：只重新索引修改时间或大小变化了的文件，删除已经不存在的文件
+    返回 (更新的文件数, 删除的文件数)
+    """
+    scripts = list_scripts(directory)
+    indexed = {script: (mtime, size) for script, mtime, size in conn.execute('SELECT script, mtime, size FROM files')}
+    updated = removed = 0
+
+    with conn:
+        for script in indexed.keys() - scripts.keys():
+            _remove_script(conn, script)
+            removed += 1
+
+        for script, path in sorted(scripts.items()):
+            st = os.stat(path)
+            if indexed.get(script) == (st.st_mtime_ns, st.st_size):
+                continue
+            if script in indexed:
+                # 先删掉旧的内容，解析失败的文件在改好之前不会再搜到过时的文本
+                _remove_script(conn, script)
+            try:
+                _, entries = txt_to_entries(path)
+            except Exception as e:
+                print(f'警告：{path} 解析失败，跳过：{e}')
+                if script in indexed:
+                    removed += 1
+                continue
+            for entry in entries:
+                doc = conn.execute('INSERT INTO docs (script, idx, source, translation) VALUES (?, ?, ?, ?)',
+                                   (script, entry['index'], entry['original'], entry['translation'])).lastrowid
+                grams = bigrams(entry['original']) | bigrams(entry['translation'])
+                conn.executemany('INSERT INTO grams (gram, doc) VALUES (?, ?)', ((gram, doc) for gram in grams))
+            conn.execute('INSERT INTO files (script, mtime, size) VALUES (?, ?, ?)', (script, st.st_mtime_ns, st.st_size))
+            updated += 1
+
+    return updated, removed
+
+def search(conn, query):
+    """
+    查找原文或译文中包含 query 的项，返回 [(script, idx, source, translation), ...]
+    先用二元组求交集得到候选项，再检查是否真的包含整个查询串；单个字符的查询没有二元组，直接扫描
+    """
+    if not query:
+        return []
+    grams = sorted(bigrams(query))[:MAX_QUERY_GRAMS]
+    if grams:
+        sql = ' INTERSECT '.join(['SELECT doc FROM grams WHERE gram = ?'] * len(grams))
+        rows = conn.execute(f'SELECT script, idx, source, translation FROM docs WHERE doc IN ({sql}) '
+                            'ORDER BY script, idx', grams)
+    else:
+        rows = conn.execute('SELECT script, idx, source, translation FROM docs '
+                            'WHERE instr(source, ?) OR instr(translation, ?) ORDER BY script, idx', (query, query))
+    return [row for row in rows if query in row[2] or query in row[3]]
+
+def main():
+    parser = argparse.ArgumentParser(description="在提取出的txt文件中查找原文或译文。")
+    parser.add_argument('directory', help='包含txt文件的目录。')
+    parser.add_argument('query', nargs='?', help='要查找的文本，不指定时只更新索引。')
+    parser.add_argument('-d', '--index', default=DEFAULT_INDEX, help=f'索引数据库路径（默认: {DEFAULT_INDEX}）。')
+    parser.add_argument('--no-update', action='store_true', help='查找前不检查文件变化。')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"错误: 目录不存在: {args.directory}")
+        sys.exit(1)
+
+    conn = open_index(args.index)
+    if not args.no_update or args.query is None:
+        start = time.perf_counter()
+        updated, removed = update_index(conn, args.directory)
+        if updated or removed:
+            print(f'索引已更新：{updated} 个文件重新索引，{removed} 个文件移除（{time.perf_counter() - start:.2f} 秒）')
+
+    if args.query is not None:
+        start = time.perf_counter()
+        rows = search(conn, args.query)
+        elapsed = (time.perf_counter() - start) * 1000
+        for script, idx, source, translation in rows:
+            print(f'{script} {idx}：{source} → {translation}')
+        print(f'共 {len(rows)} 条（{elapsed:.1f} 毫秒）')
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import json
+import mmap
+import shutil
+import struct
+
+# 解包目录里各脚本的二进制段（table1/table3/opcode/str2）合成一个文件，代替每个脚本一个目录、最多四个小文件
+# unpack.py --sections 生成，pack.py / watch.py 发现解包目录里有这个文件就从里面读取
+# 结构：8 字节标识 + 各段数据 + JSON 索引表 + 结尾 24 字节（索引表位置、索引表大小、标识）
+#   索引表 {脚本名: {段名: [绝对偏移, 大小]}}，没有任何段的脚本也在里面（值为 {}），解包出错的脚本值为 null
+# 读取时整个文件 mmap，按偏移取出各段，不用逐个打开文件
+# 某个脚本另外有同名目录时以目录里的文件为准，单独改一个脚本的 .bin 不需要重新生成整个文件
+# 重新解包到同一个目录时先用 remove_stale 清掉另一种方式留下的旧文件，免得旧的 .bin 或旧容器盖过新解出的内容
+
+CONTAINER_NAME = 'sections.bin'
+MAGIC = b'SCWSECT1'
+SECTIONS = ('table1', 'table3', 'opcode', 'str2')
+FOOTER = struct.Struct('<QQ8s')
+
+class Container:
+    """只读打开的容器，用完后 close()"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            size = os.fstat(self.file.fileno()).st_size
+            if size < len(MAGIC) + FOOTER.size:
+                raise ValueError(f'{path}：文件过小，不是段容器')
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            index_offset, index_size, magic = FOOTER.unpack_from(self.map, size - FOOTER.size)
+            if self.map[:len(MAGIC)] != MAGIC or magic != MAGIC:
+                raise ValueError(f'{path}：标识不对，不是段容器')
+            self.index = json.loads(self.map[index_offset:index_offset + index_size].decode('utf-8'))
+        except Exception:
+            self.close()
+            raise
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def read(self, name, section):
+        """一个脚本的一段，没有这一段时返回空的 bytes；解包时出错的脚本抛出 ValueError"""
+        spans = self.index[name]
+        if spans is None:
+            raise ValueError(f'{name}：解包时出错，{CONTAINER_NAME} 中没有完整的段，请重新解包')
+        span = spans.get(section)
+        if span is None:
+            return bytes()
+        offset, size = span
+        return self.map[offset:offset + size]
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+def container_path(work_dir):
+    return os.path.join(work_dir, CONTAINER_NAME)
+
+def open_container(work_dir):
+    """解包目录里有容器时打开并返回，没有时返回 None"""
+    path = container_path(work_dir)
+    return Container(path) if os.path.exists(path) else None
+
+def list_names(work_dir):
+    """容器中的全部脚本名，没有容器时为空列表"""
+    container = open_container(work_dir)
+    if container is None:
+        return []
+    try:
+        return container.names()
+    finally:
+        container.close()
+
+class PartWriter:
+    """
+    一个工作进程写出的一部分段数据，最后由 write_container 拼成容器
+    每个脚本的各段按位置顺序依次写入，所以每一段在文件中都是连续的；第一次写入时才创建文件
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def section(self, spans, section):
+        """返回把数据追加到 section 段的写入函数，段的 [偏移, 大小] 记在 spans 里"""
+        def write(data):
+            if self.file is None:
+                self.file = open(self.path, 'wb')
+            span = spans.get(section)
+            if span is None:
+                span = spans[section] = [self.file.tell(), 0]
+            self.file.write(data)
+            span[1] += len(data)
+        return write
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+def remove_stale(output_dir, names, use_sections):
+    """
+    解包前清掉另一种方式留下的旧文件，返回要打印的说明
+    写容器时删除 names 中各脚本目录里的 table1.bin 等文件，目录空了就删掉目录，还有其他文件时提示；
+    不写容器时删除旧的容器
+    """
+    messages = []
+    if not use_sections:
+        path = container_path(output_dir)
+        if os.path.exists(path):
+            os.remove(path)
+            messages.append(f"已删除旧的段容器 '{path}'，各脚本的 .bin 改为写在各自的目录里")
+        return messages
+    removed = 0
+    for name in names:
+        item_dir = os.path.join(output_dir, name)
+        if not os.path.isdir(item_dir):
+            continue
+        for section in SECTIONS:
+            path = os.path.join(item_dir, f'{section}.bin')
+            if os.path.exists(path):
+                os.remove(path)
+        if os.listdir(item_dir):
+            messages.append(f"警告：'{item_dir}' 中还有其他文件，打包时仍以这个目录为准，不会读取 {CONTAINER_NAME}")
+        else:
+            os.rmdir(item_dir)
+            removed += 1
+    if removed:
+        messages.append(f"已删除 {removed} 个旧的脚本目录，各脚本的 .bin 改为写在 {CONTAINER_NAME} 里")
+    return messages
+
+def write_container(path, entries):
+    """
+    把各部分拼成容器，entries 为按顺序的 (脚本名, 部分文件路径, {段名: [部分内偏移, 大小]})，
+    没有任何段的脚本部分文件路径为 None，解包出错的脚本段为 None（索引中记为 null）
+    先写到临时文件再替换，最后删除各部分
+    """
+    temp_path = path + '.tmp'
+    bases = {}
+    with open(temp_path, 'wb') as out:
+        out.write(MAGIC)
+        for _, part, _ in entries:
+            if part is not None and part not in bases:
+                bases[part] = out.tell()
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+        index = {name: None if spans is None else
+                       {section: [bases[part] + offset, size] for section, (offset, size) in spans.items()}
+                 for name, part, spans in entries}
+        index_data = json.dumps(index, ensure_ascii=False).encode('utf-8')
+        index_offset = out.tell()
+        out.write(index_data)
+        out.write(FOOTER.pack(index_offset, len(index_data), MAGIC))
+    os.replace(temp_path, path)
+    for part in bases:
+        os.remove(part)
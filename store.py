@@ -0,0 +1,190 @@
+import os
+import re
+import sys
+import sqlite3
+import argparse
+
+from tojson import txt_to_entries, entries_to_txt
+
+# 所有脚本的文本存放在一个 SQLite 数据库里，代替每个脚本一个的txt文件
+# scripts: 每个脚本的描述文本和文本数（对应txt开头的两行 ；；）
+# entries: 每一项的原文和译文，(script, idx) 为主键，idx 从 0 开始，与 table2 的顺序一致
+# entries_text: 原文和译文的 FTS5 三元组（trigram）索引，用于查找包含某段文字的条目（find）
+#   rowid 为 (scripts 的 rowid << IDX_BITS) | idx，重写一个脚本时按 rowid 范围删除旧的索引
+#   SQLite 不支持 FTS5 trigram（3.34 以前）时不建这个表，find 退回逐条扫描
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scripts (
+    script TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    script TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    PRIMARY KEY (script, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_source ON entries (source);
+CREATE INDEX IF NOT EXISTS entries_translation ON entries (translation);
+CREATE INDEX IF NOT EXISTS entries_untranslated ON entries (script, idx) WHERE source = translation;
+'''
+
+TEXT_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_text USING fts5(
+    source, translation, script UNINDEXED, idx UNINDEXED, tokenize = 'trigram case_sensitive 1'
+);
+'''
+TEXT_VERSION = 1 # PRAGMA user_version 小于这个值时 entries_text 还没有建立，打开时从 entries 补齐
+IDX_BITS = 20    # 每个脚本最多 2^20 项
+MIN_MATCH = 3    # trigram 索引只能查找至少 3 个字符的文字，更短的逐条扫描
+
+HEADER_PATTERN = re.compile(r'；；(.*?)\n；；(\d+)')
+
+def open_store(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.executescript(SCHEMA)
+    try:
+        conn.executescript(TEXT_SCHEMA)
+    except sqlite3.OperationalError:
+        return conn
+    if conn.execute('PRAGMA user_version').fetchone()[0] < TEXT_VERSION:
+        # 以前的数据库没有 entries_text，一次补齐
+        with conn:
+            conn.execute('DELETE FROM entries_text')
+            conn.execute(f'INSERT INTO entries_text (rowid, source, translation, script, idx) '
+                         f'SELECT (s.rowid << {IDX_BITS}) | e.idx, e.source, e.translation, e.script, e.idx '
+                         'FROM entries e JOIN scripts s ON s.script = e.script')
+            conn.execute(f'PRAGMA user_version = {TEXT_VERSION}')
+    return conn
+
+def _has_text_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entries_text'").fetchone() is not None
+
+def write_script(conn, script, description, sources, translations=None, count=None):
+    """
+    写入（覆盖）一个脚本的全部文本，translations 为空时译文与原文相同
+    count 为txt文件头记录的文本数，默认为条目数
+    """
+    if translations is None:
+        translations = sources
+    if count is None:
+        count = len(sources)
+    rows = [(script, i, s, t) for i, (s, t) in enumerate(zip(sources, translations))]
+    conn.execute('DELETE FROM entries WHERE script = ?', (script,))
+    # 用 UPSERT 而不是 INSERT OR REPLACE，脚本的 rowid 保持不变，entries_text 的 rowid 才能按范围删除
+    conn.execute('INSERT INTO scripts (script, description, count) VALUES (?, ?, ?) '
+                 'ON CONFLICT (script) DO UPDATE SET description = excluded.description, count = excluded.count',
+                 (script, description, count))
+    conn.executemany('INSERT INTO entries (script, idx, source, translation) VALUES (?, ?, ?, ?)', rows)
+    if _has_text_index(conn):
+        base = conn.execute('SELECT rowid FROM scripts WHERE script = ?', (script,)).fetchone()[0] << IDX_BITS
+        conn.execute('DELETE FROM entries_text WHERE rowid BETWEEN ? AND ?', (base, base + (1 << IDX_BITS) - 1))
+        conn.executemany('INSERT INTO entries_text (rowid, source, translation, script, idx) VALUES (?, ?, ?, ?, ?)',
+                         ((base | i, s, t, script, i) for script, i, s, t in rows))
+
+def read_script(conn, script):
+    """
+    读取一个脚本，返回 (描述文本, 文本数, 译文列表)，脚本不存在时返回 None
+    译文列表按 idx 排序，文本数是导入时记录的值，与实际条目数不一致说明数据有问题
+    """
+    row = conn.execute('SELECT description, count FROM scripts WHERE script = ?', (script,)).fetchone()
+    if row is None:
+        return None
+    translations = [t for (t,) in conn.execute(
+        'SELECT translation FROM entries WHERE script = ? ORDER BY idx', (script,))]
+    return row[0], row[1], translations
+
+def import_txt(conn, directory):
+    """把目录下 unpack.py 生成的txt文件导入数据库，返回导入的脚本数"""
+    count = 0
+    with conn:
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.txt'):
+                continue
+            header, entries = txt_to_entries(os.path.join(directory, filename))
+            m = HEADER_PATTERN.search(header)
+            if m is None:
+                raise ValueError(f'{filename}：未发现描述文本或文本数！')
+            # 文本数以文件头为准，pack 时再检查是否一致
+            write_script(conn, filename[:-4], m.group(1), [e['original'] for e in entries],
+                         [e['translation'] for e in entries], int(m.group(2)))
+            count += 1
+    return count
+
+def export_txt(conn, directory):
+    """把数据库导出为 unpack.py 格式的txt文件，返回导出的脚本数"""
+    os.makedirs(directory, exist_ok=True)
+    scripts = conn.execute('SELECT script, description, count FROM scripts ORDER BY script').fetchall()
+    for script, description, count in scripts:
+        entries = [{'index': i, 'original': s, 'translation': t} for i, s, t in conn.execute(
+            'SELECT idx, source, translation FROM entries WHERE script = ? ORDER BY idx', (script,))]
+        entries_to_txt(f'；；{description}\n；；{count}', entries, os.path.join(directory, f'{script}.txt'))
+    return len(scripts)
+
+def untranslated(conn, script=None):
+    """译文与原文相同的条目，返回 [(script, idx, source), ...]"""
+    if script is None:
+        return conn.execute('SELECT script, idx, source FROM entries WHERE source = translation '
+                            'ORDER BY script, idx').fetchall()
+    return conn.execute('SELECT script, idx, source FROM entries WHERE script = ? AND source = translation '
+                        'ORDER BY idx', (script,)).fetchall()
+
+def find(conn, text):
+    """
+    原文或译文中包含 text 的所有条目，返回 [(script, idx, source, translation), ...]
+    至少 3 个字符时查 entries_text 的三元组索引，更短的（或没有索引时）逐条扫描
+    """
+    if not text:
+        return []
+    if len(text) >= MIN_MATCH and _has_text_index(conn):
+        phrase = '"' + text.replace('"', '""') + '"'
+        rows = conn.execute('SELECT script, idx, source, translation FROM entries_text WHERE entries_text MATCH ? '
+                            'ORDER BY script, idx', (phrase,))
+    else:
+        rows = conn.execute('SELECT script, idx, source, translation FROM entries '
+                            'WHERE instr(source, ?) OR instr(translation, ?) ORDER BY script, idx', (text, text))
+    return [row for row in rows if text in row[2] or text in row[3]]
+
+def main():
+    parser = argparse.ArgumentParser(description="用 SQLite 数据库保存全部脚本文本。")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('import', help='把txt目录导入数据库')
+    p.add_argument('directory')
+    p.add_argument('db')
+    p = sub.add_parser('export', help='把数据库导出为txt目录')
+    p.add_argument('db')
+    p.add_argument('directory')
+    p = sub.add_parser('untranslated', help='列出未翻译（译文与原文相同）的条目')
+    p.add_argument('db')
+    p.add_argument('script', nargs='?')
+    p = sub.add_parser('find', help='列出原文或译文中包含指定文本的条目')
+    p.add_argument('db')
+    p.add_argument('text')
+    args = parser.parse_args()
+
+    if args.command != 'import' and not os.path.exists(args.db):
+        print(f"错误：未找到数据库 '{args.db}'")
+        sys.exit(1)
+    conn = open_store(args.db)
+
+    if args.command == 'import':
+        print(f'导入了 {import_txt(conn, args.directory)} 个脚本')
+    elif args.command == 'export':
+        print(f'导出了 {export_txt(conn, args.directory)} 个脚本')
+    elif args.command == 'untranslated':
+        rows = untranslated(conn, args.script)
+        for script, idx, source in rows:
+            print(f'{script} {idx}：{source}')
+        print(f'共 {len(rows)} 条未翻译')
+    elif args.command == 'find':
+        rows = find(conn, args.text)
+        for script, idx, source, translation in rows:
+            print(f'{script} {idx}：{source} → {translation}')
+        print(f'共 {len(rows)} 条')
+    conn.close()
+
+if __name__ == "__main__":
+    main()
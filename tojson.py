@@ -1,58 +1,206 @@
-import re
-import json
-from collections import OrderedDict
-
-# 定义分隔符（与原始脚本一致）
-BLACK_DELIMITER = '■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■'
-WHITE_DELIMITER = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□'
-
-def txt_to_dict(filepath):
-    """
-    将黑白方块分隔的txt文件转换为有序字典
-    格式: {原文1: 译文1, 原文2: 译文2, ...}
-    """
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    result = OrderedDict()
-    
-    # 按黑色方块分割大块（每个大块包含原文+白色方块+译文）
-    blocks = re.split(re.escape(BLACK_DELIMITER), content)
-    
-    for block in blocks:
-        # 按白色方块分割原文和译文
-        parts = re.split(re.escape(WHITE_DELIMITER), block.strip(), 1)
-        if len(parts) == 2:
-            original = parts[0].strip()
-            translated = parts[1].strip()
-            if original:  # 忽略空原文
-                result[original] = translated
-    
-    return result
-
-def save_as_json(data, output_path):
-    """保存字典为JSON文件"""
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-if __name__ == "__main__":
-    import argparse
-
-    parser = argparse.ArgumentParser(description="将黑白方块分隔的txt文件转为JSON")
-    parser.add_argument('input_file', help='输入文件路径（.txt格式）')
-    parser.add_argument('-o', '--output', default='output.json', 
-                       help='输出JSON路径（默认: output.json）')
-    
-    args = parser.parse_args()
-    
-    if not args.input_file.endswith('.txt'):
-        print("错误：请指定.txt文件")
-        exit(1)
-    
-    print(f"正在转换文件: {args.input_file} -> {args.output}")
-    try:
-        data = txt_to_dict(args.input_file)
-        save_as_json(data, args.output)
-        print(f"成功转换 {len(data)} 条数据！")
-    except Exception as e:
-        print(f"转换失败: {e}")
\ No newline at end of file
+import os
+import re
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# 定义分隔符（与原始脚本一致）
+BLACK_DELIMITER = '■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■'
+WHITE_DELIMITER = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□'
+SCRIPT_HEADER = '；；' # unpack.py 生成的txt以 ；；描述文本 开头，目录模式只转换这样的文件
+CHUNK_SIZE = 1 << 16
+
+def txt_to_dict(filepath):
+    """
+    将黑白方块分隔的txt文件转换为有序字典
+    格式: {原文1: 译文1, 原文2: 译文2, ...}
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    result = OrderedDict()
+    
+    # 按黑色方块分割大块（每个大块包含原文+白色方块+译文）
+    blocks = re.split(re.escape(BLACK_DELIMITER), content)
+    
+    for block in blocks:
+        # 按白色方块分割原文和译文
+        parts = re.split(re.escape(WHITE_DELIMITER), block.strip(), 1)
+        if len(parts) == 2:
+            original = parts[0].strip()
+            translated = parts[1].strip()
+            if original:  # 忽略空原文
+                result[original] = translated
+    
+    return result
+
+def save_as_json(data, output_path):
+    """保存字典为JSON文件"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def iter_blocks(f):
+    """分段读取，依次产生按黑色方块分开的各块，与 content.split(BLACK_DELIMITER) 的结果相同"""
+    buffer = ''
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), ''):
+        buffer += chunk
+        blocks = buffer.split(BLACK_DELIMITER)
+        buffer = blocks.pop()
+        yield from blocks
+    yield buffer
+
+def iter_entries(blocks):
+    """把文件头之后的各块依次转为条目 {'index': 序号, 'original': 原文, 'translation': 译文}"""
+    for index, block in enumerate(blocks):
+        parts = block.split(WHITE_DELIMITER, 1)
+        if len(parts) != 2:
+            raise ValueError(f'第 {index} 项无法按白色方块拆分')
+        yield {'index': index, 'original': parts[0].strip(), 'translation': parts[1].strip()}
+
+def txt_to_entries(filepath):
+    """
+    将黑白方块分隔的txt文件转换为 (文件头, 条目列表)
+    文件头是第一个黑色方块之前的内容（；；描述文本 和 ；；文本数），
+    条目格式: {'index': 序号, 'original': 原文, 'translation': 译文}，重复原文也会保留
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        blocks = iter_blocks(f)
+        header = next(blocks).strip()
+        return header, list(iter_entries(blocks))
+
+def is_script_txt(filepath):
+    """是否是 unpack.py 生成的脚本txt（以 ；； 开头）"""
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read(len(SCRIPT_HEADER)) == SCRIPT_HEADER
+
+def entries_to_txt(header, entries, output_path):
+    """按 unpack.py 的格式把文件头和条目写回txt文件"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(f'{header}\n\n')
+        for entry in sorted(entries, key=lambda e: e['index']):
+            f.write(f"\n{BLACK_DELIMITER}\n{entry['original']}")
+            f.write(f"\n{WHITE_DELIMITER}\n{entry['translation']}")
+
+def save_entries_as_json(header, entries, output_path):
+    """
+    逐条写出JSON，entries 可以是边解析边产生的生成器，不在内存中保留全部条目，返回条目数
+    先写到临时文件，解析中途出错时删除临时文件，不留下写了一半的JSON
+    格式: {"header": 文件头, "entries": [{"index": 0, "original": ..., "translation": ...}, ...]}
+    """
+    temp_path = output_path + '.tmp'
+    count = 0
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('{\n  "header": ')
+            f.write(json.dumps(header, ensure_ascii=False))
+            f.write(',\n  "entries": [')
+            for entry in entries:
+                f.write(',\n    ' if count else '\n    ')
+                f.write(json.dumps(entry, ensure_ascii=False))
+                count += 1
+            f.write('\n  ]\n}\n' if count else ']\n}\n')
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, output_path)
+    return count
+
+def load_entries_from_json(input_path):
+    """读取 save_entries_as_json 写出的JSON，返回 (文件头, 条目列表)"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['header'], data['entries']
+
+def convert_file(task):
+    """
+    转换单个文件，task 为 (输入路径, 输出路径, 是否反向)
+    返回 (输入路径, 条目数, 错误信息)
+    """
+    input_path, output_path, reverse = task
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if reverse:
+            header, entries = load_entries_from_json(input_path)
+            entries_to_txt(header, entries, output_path)
+            return input_path, len(entries), None
+        # 边解析边写出，每一项解析出来就写进JSON
+        with open(input_path, 'r', encoding='utf-8') as f:
+            blocks = iter_blocks(f)
+            header = next(blocks).strip()
+            count = save_entries_as_json(header, iter_entries(blocks), output_path)
+        return input_path, count, None
+    except Exception as e:
+        return input_path, 0, str(e)
+
+def convert_directory(input_dir, output_dir, reverse=False, jobs=None):
+    """
+    并行转换整个目录（txt → json，reverse 时 json → txt），输出保持相同的目录结构
+    txt → json 时只转换以 ；； 开头的脚本txt，names.txt、报告等其他txt跳过
+    返回 (成功文件数, 条目总数, [(路径, 错误信息), ...], [跳过的路径, ...])
+    """
+    src_ext, dst_ext = ('.json', '.txt') if reverse else ('.txt', '.json')
+    tasks = []
+    skipped = []
+    for root, _, files in os.walk(input_dir):
+        for filename in sorted(files):
+            if filename.endswith(src_ext):
+                input_path = os.path.join(root, filename)
+                if not reverse and not is_script_txt(input_path):
+                    skipped.append(input_path)
+                    continue
+                relative_path = os.path.relpath(input_path, input_dir)
+                output_path = os.path.join(output_dir, relative_path[:-len(src_ext)] + dst_ext)
+                tasks.append((input_path, output_path, reverse))
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        results = [convert_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(convert_file, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+    errors = [(path, error) for path, _, error in results if error is not None]
+    total = sum(count for _, count, error in results if error is None)
+    return len(results) - len(errors), total, errors, skipped
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="将黑白方块分隔的txt文件转为JSON，或把JSON转回txt")
+    parser.add_argument('input_file', help='输入文件路径（.txt格式，-r 时为.json），或包含这些文件的目录')
+    parser.add_argument('-o', '--output', default=None,
+                       help='输出路径（默认: 单个文件为 output.json / output.txt，目录为 输入目录_json / 输入目录_txt）')
+    parser.add_argument('-r', '--reverse', action='store_true', help='反向转换：json → txt')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='目录模式的并行进程数（默认: CPU 核心数）')
+    
+    args = parser.parse_args()
+    dst_ext = '.txt' if args.reverse else '.json'
+
+    if os.path.isdir(args.input_file):
+        # 输出目录放在输入目录旁边；按绝对路径取目录名，输入为 . 时也能得到正常的名字
+        input_dir = os.path.abspath(args.input_file)
+        output_dir = args.output or os.path.join(os.path.dirname(input_dir), os.path.basename(input_dir) + '_' + dst_ext[1:])
+        print(f"正在转换目录: {args.input_file} -> {output_dir}")
+        converted, total, errors, skipped = convert_directory(args.input_file, output_dir, args.reverse, args.jobs)
+        if skipped:
+            print(f"跳过 {len(skipped)} 个不是脚本的txt文件（不以 {SCRIPT_HEADER} 开头）：{'、'.join(os.path.basename(path) for path in skipped[:5])}"
+                  + ('……' if len(skipped) > 5 else ''))
+        for path, error in errors:
+            print(f"转换失败: {path}：{error}")
+        print(f"成功转换 {converted} 个文件，共 {total} 条数据！")
+        if errors:
+            exit(1)
+        exit(0)
+
+    if not args.input_file.endswith('.json' if args.reverse else '.txt'):
+        print("错误：请指定.json文件" if args.reverse else "错误：请指定.txt文件")
+        exit(1)
+    
+    output = args.output or 'output' + dst_ext
+    print(f"正在转换文件: {args.input_file} -> {output}")
+    _, count, error = convert_file((args.input_file, output, args.reverse))
+    if error is None:
+        print(f"成功转换 {count} 条数据！")
+    else:
+        print(f"转换失败: {error}")
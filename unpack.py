@@ -1,373 +1,392 @@
-import struct
-import os
-import sys
-import argparse
-import io # To treat bytearray as a file
-
-# --- Reused from .py.txt and scw.py ---
-
-def ExtractString(data, IdxQ, str_data):
-    c_addr = 0
-    string_ = []
-    for i in range(IdxQ):
-        #name = read_string(f, c_addr)
-        start = struct.unpack('<I', data[c_addr : c_addr+ 4])[0]
-        end = struct.unpack('<I', data[c_addr + 8 : c_addr + 12])[0]
-        string = str_data[start:start+end].decode(编码)
-        if '\n\n' in string:
-            print(string)
-        string_.append(string.replace('\x00', ''))
-        c_addr += 16
-
-    return string_
-
-
-def xor_decrypt(data: bytes, key_byte: int = 0xff) -> bytearray:
-    decrypted_data = bytearray(data)
-    for i in range(len(decrypted_data)):
-        decrypted_data[i] ^= (i & key_byte)
-    return decrypted_data
-
-class LzDecompressor:
-    def __init__(self, input_data: bytes):
-        self.input_data = input_data
-        self.input_pos = 0
-        self.output_buffer = bytearray()
-        self.window = bytearray(0x1000)
-        self.window_pos = 0xfee
-        self.c_bit_buffer = 0
-
-    def decompress(self) -> bytearray:
-        self.window = bytearray(0x1000)
-        self.window_pos = 0xfee
-        self.input_pos = 0
-        self.output_buffer = bytearray()
-        self.c_bit_buffer = 0
-
-        while True:
-            while True:
-                self.c_bit_buffer >>= 1
-                if (self.c_bit_buffer & 0x100) == 0:
-                    if self.input_pos >= len(self.input_data):
-                        return self.output_buffer
-                    new_byte = self.input_data[self.input_pos]
-                    self.input_pos += 1
-                    self.c_bit_buffer = (0xff << 8) | new_byte
-
-                is_literal = self.c_bit_buffer & 1
-
-                if is_literal == 0:
-                    break
-
-                if self.input_pos >= len(self.input_data):
-                    return self.output_buffer
-
-                literal_byte = self.input_data[self.input_pos]
-                self.input_pos += 1
-                self.output_buffer.append(literal_byte)
-                self.window[self.window_pos] = literal_byte
-                self.window_pos = (self.window_pos + 1) & 0xfff
-
-            if self.input_pos >= len(self.input_data):
-                 return self.output_buffer
-
-            byte1 = self.input_data[self.input_pos]
-            if self.input_pos + 1 >= len(self.input_data):
-                return self.output_buffer
-
-            byte2 = self.input_data[self.input_pos + 1]
-            self.input_pos += 2
-
-            offset = byte1 | ((byte2 & 0xf0) << 4)
-            length = (byte2 & 0x0f) + 2
-
-            for iVar4 in range(length + 1):
-                byte_to_copy = self.window[(offset + iVar4) & 0xfff]
-                self.output_buffer.append(byte_to_copy)
-                self.window[self.window_pos] = byte_to_copy
-                self.window_pos = (self.window_pos + 1) & 0xfff
-
-# --- Reused and adapted from r.py ---
-
-def read_string_from_bytesio(f_io: io.BytesIO, size: int) -> str:
-    """Reads a null-terminated string up to a given size from a BytesIO object."""
-    string_bytes = bytearray()
-    for _ in range(size):
-        char = f_io.read(1)
-        if char == b'\x00' or not char:
-            break
-        string_bytes.extend(char)
-    # Consume remaining bytes for the fixed size field
-    f_io.read(size - len(string_bytes) - (1 if len(string_bytes) < size else 0)) # Read up to null or size limit
-    try:
-        return string_bytes.decode('shift-jis').rstrip('\x00') # Try Shift-JIS, remove trailing nulls
-    except UnicodeDecodeError:
-        try:
-             return string_bytes.decode('gbk').rstrip('\x00') # Try GBK
-        except UnicodeDecodeError:
-             return string_bytes.decode('latin1').rstrip('\x00') # Fallback to latin1
-
-
-def read_uint32_from_bytesio(f_io: io.BytesIO) -> int:
-    """Reads a little-endian unsigned 32-bit integer from a BytesIO object."""
-    data = f_io.read(4)
-    if len(data) < 4:
-        raise EOFError("Not enough data to read uint32")
-    return struct.unpack('<I', data)[0]
-
-# --- Constants ---
-
-PAK_HEADER_SIZE = 0x1C
-FILE_ENTRY_SIZE = 0x28 # Size of each entry in the decompressed index
-FILE_HEADER_SIZE = 0xC8
-MAGIC_NUMBER = 0x3000003
-COMPRESSED_FLAG = 0xFFFFFFFF
-XOR_KEY = 0xFF
-
-# --- Main Extraction Logic ---
-
-def extract_pak(pak_filepath: str, output_dir: str):
-    """
-    Extracts files from a pak archive.
-
-    Args:
-        pak_filepath: Path to the input pak file.
-        output_dir: Directory to save the extracted files.
-    """
-    if not os.path.exists(pak_filepath):
-        print(f"错误：未找到输入文件 '{pak_filepath}'")
-        return
-
-    os.makedirs(output_dir, exist_ok=True)
-
-    try:
-        with open(pak_filepath, 'rb') as f:
-            # 1. 读取 pak 文件主头部
-            pak_header = f.read(PAK_HEADER_SIZE)
-            if len(pak_header) < PAK_HEADER_SIZE:
-                print(f"错误：文件过小，无法读取完整的 pak 主头部。")
-                return
-
-            try:
-                # pak 主头部结构 (基于之前的分析):
-                # 0x10: compressed_index_size (uint32_t)
-                # 0x14: num_files (uint32_t)
-                # 0x18: data_block_absolute_offset (uint32_t)
-                compressed_index_size = struct.unpack('<I', pak_header[0x10:0x14])[0]
-                num_files = struct.unpack('<I', pak_header[0x14:0x18])[0]
-                data_block_absolute_offset = struct.unpack('<I', pak_header[0x18:0x1C])[0]
-
-            except struct.error as e:
-                print(f"错误：解析 pak 主头部失败：{e}")
-                return
-
-            print(f"--- Pak 主头部信息 ---")
-            print(f"压缩索引表大小 (0x10): {compressed_index_size} 字节")
-            print(f"文件数量 (0x14): {num_files}")
-            print(f"数据块绝对偏移量 (0x18): 0x{data_block_absolute_offset:X}")
-            print("-" * 30)
-
-            # 2. 读取、解密和解压索引表
-            compressed_index_start_offset = PAK_HEADER_SIZE
-            f.seek(compressed_index_start_offset)
-            compressed_index_data = f.read(compressed_index_size)
-            if len(compressed_index_data) < compressed_index_size:
-                print(f"错误：读取压缩索引表数据时文件提前结束。")
-                return
-
-            print(f"读取了 {len(compressed_index_data)} 字节的压缩索引表数据。")
-
-            xor_decrypted_index_data = xor_decrypt(compressed_index_data, XOR_KEY)
-            print("索引表 XOR 解密完成。")
-
-            decompressor = LzDecompressor(xor_decrypted_index_data)
-            decompressed_index_data = decompressor.decompress()
-            print(f"索引表 LZ 解压完成。大小: {len(decompressed_index_data)} 字节。")
-
-            # 3. 解析解压后的索引表
-            print("--- 解析索引表 ---")
-            index_io = io.BytesIO(decompressed_index_data)
-            files_info = []
-
-            for i in range(num_files):
-                try:
-                    # 索引表条目结构 (基于 r.py 分析):
-                    # 0x00 - 0x1F (32 bytes): 文件名 (null 终止)
-                    # 0x20 - 0x23 (4 bytes): 文件在数据块中的相对偏移量
-                    # 0x24 - 0x27 (4 bytes): 文件未压缩大小
-
-                    filename = read_string_from_bytesio(index_io, 32)
-                    file_relative_offset = read_uint32_from_bytesio(index_io)
-                    file_uncompressed_size_index = read_uint32_from_bytesio(index_io)
-
-                    files_info.append({
-                        'filename': filename,
-                        'relative_offset': file_relative_offset,
-                        'uncompressed_size_index': file_uncompressed_size_index
-                    })
-                    # print(f"文件 {i}: '{filename}', 相对偏移: 0x{file_relative_offset:X}, 未压缩大小: {file_uncompressed_size_index}")
-
-                except EOFError:
-                    print(f"警告：解析索引表时提前到达文件末尾，可能索引表损坏。已读取 {i} 个文件信息。")
-                    break
-                except Exception as e:
-                    print(f"错误：解析索引表条目 {i} 失败：{e}")
-                    # Skip this entry and try the next
-                    index_io.seek(index_io.tell() + (FILE_ENTRY_SIZE - (index_io.tell() % FILE_ENTRY_SIZE))) # Attempt to seek to the start of the next entry
-                    continue
-
-            print(f"成功解析了 {len(files_info)} 个文件信息。")
-            print("--- 提取文件数据 ---")
-
-            # 4. 提取和处理每个文件数据
-            for i, file_info in enumerate(files_info):
-                filename = file_info['filename']
-                relative_offset = file_info['relative_offset']
-                uncompressed_size_index = file_info['uncompressed_size_index']
-
-                file_absolute_offset = data_block_absolute_offset + relative_offset
-                
-
-                print(f"正在处理文件 {i+1}\{len(files_info)}: '{filename}' (偏移: 0x{file_absolute_offset:X})")
-
-                try:
-                    f.seek(file_absolute_offset)
-                    file_header = f.read(FILE_HEADER_SIZE)
-                    if len(file_header) < FILE_HEADER_SIZE:
-                        print(f"警告：文件 '{filename}' 头部过小，无法读取完整的 0x{FILE_HEADER_SIZE:X} 字节头部。跳过。")
-                        continue
-
-                    # 文件数据块头部结构 (基于 scw.py 分析):
-                    # 0x10: magic_number (0x3000003)
-                    # 0x14: compression_flag (-1 for compressed)
-                    # 0x18: compressed_size_plus_1
-                    # 0x1C: uncompressed_size_header
-
-                    magic_number = struct.unpack('<I', file_header[0x10:0x14])[0]
-                    compression_flag = struct.unpack('<I', file_header[0x14:0x18])[0]
-                    compressed_size_plus_1 = struct.unpack('<I', file_header[0x18:0x1C])[0]
-                    uncompressed_size_final = struct.unpack('<I', file_header[0x1C:0x20])[0]
-                    tabel1_IdxQ = struct.unpack('<I', file_header[0x28:0x2c])[0]
-                    tabel2_IdxQ = struct.unpack('<I', file_header[0x2c:0x30])[0]
-                    tabel3_IdxQ = struct.unpack('<I', file_header[0x30:0x34])[0]
-                    opcode_size = struct.unpack('<I', file_header[0x34:0x38])[0]
-                    str1_size =  struct.unpack('<I', file_header[0x38:0x3c])[0]
-                    str2_size =  struct.unpack('<I', file_header[0x3c:0x40])[0]
-
-                    #if magic_number != MAGIC_NUMBER:
-                    #    print(f"警告：文件 '{filename}' 头部魔数无效 (0x{magic_number:X})，期望 0x{MAGIC_NUMBER:X}。跳过。")
-                    #    continue
-
-
-
-
-                    is_compressed = (compression_flag == COMPRESSED_FLAG)
-                    
-
-                    if is_compressed:
-                        data_payload_size = compressed_size_plus_1
-                        data_payload_offset = file_absolute_offset + FILE_HEADER_SIZE
-                        print(f"  文件 '{filename}' 是压缩的。压缩大小: {data_payload_size} 字节, 期望未压缩大小: {uncompressed_size_final} 字节。")
-                    else:
-                        data_payload_offset = file_absolute_offset
-                        data_payload_size = file_uncompressed_size_index # For uncompressed, payload size is uncompressed size
-                        print(f"  文件 '{filename}' 是未压缩的。大小: {data_payload_size} 字节。")
-
-                    
-                    f.seek(data_payload_offset)
-                    data_payload = f.read(data_payload_size)
-
-                    if len(data_payload) < data_payload_size:
-                         print(f"警告：文件 '{filename}' 数据负载过小，期望 {data_payload_size} 字节，实际读取 {len(data_payload)} 字节。可能数据损坏。")
-                         # Proceed with partial data, decompression might fail
-                         pass # Continue processing with available data
-
-                    processed_data = data_payload
-
-                    if is_compressed and len(data_payload) > 0: # Only process if data was actually read
-                        try:
-                            xor_decrypted_data = xor_decrypt(data_payload)
-                            processed_data = LzDecompressor(xor_decrypted_data).decompress()
-                            if len(processed_data) != uncompressed_size_final:
-                                print(f"警告：文件 '{filename}' 解压后大小 ({len(processed_data)}) 与期望大小 ({uncompressed_size_final}) 不匹配。")
-                        except Exception as de_e:
-                            print(f"错误：文件 '{filename}' 解压失败：{de_e}。保存原始（XOR 解密后）数据。")
-                            processed_data = xor_decrypted_data # Save XOR decrypted data on decompression failure
-
-                    # Ensure output directory for this file exists (handles subdirectories in filenames)
-                    output_filepath = os.path.join(output_dir, filename)
-                    
-                    if is_compressed:
-                        os.makedirs(output_filepath, exist_ok=True)
-                        print(f"  已保存到 '{output_filepath}'")
-
-                        tabel1 = tabel1_IdxQ * 4 * 4
-                        tabel2 = tabel1 + tabel2_IdxQ * 4 * 4
-                        tabel3 = tabel2 + tabel3_IdxQ * 4 * 4
-                        opcode = tabel3 + opcode_size
-                        str1 = opcode + str1_size
-                        str2 = str1 + str2_size
-                        
-                        if len(processed_data[:tabel1]) > 0:
-                            with open(os.path.join(output_filepath, 'table1.bin'), 'wb') as outfile:
-                                outfile.write(processed_data[:tabel1])
-                        
-                        if len(processed_data[tabel2:tabel3]) > 0:
-                            with open(os.path.join(output_filepath, 'table3.bin'), 'wb') as outfile:
-                                outfile.write(processed_data[tabel2:tabel3])
-                        
-                        if len(processed_data[tabel3:opcode]) > 0:
-                            with open(os.path.join(output_filepath, 'opcode.bin'), 'wb') as outfile:
-                                outfile.write(processed_data[tabel3:opcode])
-
-                        if len(processed_data[str1:str2]) > 0:
-                            with open(os.path.join(output_filepath, 'str2.bin'), 'wb') as outfile:
-                                outfile.write(processed_data[str1:str2])
-                        
-                        string = ExtractString(processed_data[tabel1:tabel2], tabel2_IdxQ, processed_data[opcode:str1])
-                        
-                        if len(string) > 0:
-                            with open(os.path.join(output_dir, f'{filename}.txt'), 'w', encoding='utf-8') as outfile:
-                                outfile.write(f'；；{file_header[0x88:0xc8].decode(编码).replace('\x00', '')}\n')
-                                outfile.write(f'；；{tabel2_IdxQ}\n\n')
-                                a = 0
-                                for str in string:
-                                    a +=1
-                                    #outfile.write(f'{a}:{str}\n\n')
-                                    outfile.write(f'\n■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■\n{str}')
-                                    outfile.write(f'\n□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□\n{str}')
-
-                                
-                        
-                    else:
-                        with open(output_filepath, 'wb') as outfile:
-                            outfile.write(processed_data)
-                        print(f"  已保存到 '{output_filepath}'")
-
-                except Exception as file_e:
-                    print(f"错误：处理文件 '{filename}' (偏移: 0x{file_absolute_offset:X}) 时发生错误：{file_e}")
-                    continue # Continue with the next file
-
-
-    except FileNotFoundError:
-        print(f"错误：未找到输入文件 '{pak_filepath}'")
-    except Exception as e:
-        print(f"发生意外错误：{e}")
-
-
-# --- Command Line Interface ---
-
-if __name__ == "__main__":
-    编码 = 'cp932'
-    parser = argparse.ArgumentParser(description="从 pak 封包文件中提取并解压文件。")
-    parser.add_argument("input_file", help="输入 pak 文件的路径。")
-    parser.add_argument("output_dir", help="保存提取文件的输出文件夹路径。")
-
-    args = parser.parse_args()
-
-    input_pak_path = args.input_file
-    output_folder_path = args.output_dir
-
-    print(f"开始处理封包文件 '{input_pak_path}'...")
-    extract_pak(input_pak_path, output_folder_path)
-    print("处理完成")
+import struct
+import os
+import sys
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import store
+import sections
+import profiler
+import pakfmt
+
+# --- Reused from .py.txt and scw.py ---
+
+def ExtractString(data, IdxQ, str_data, entry_size=16, length_at=8, encoding='cp932'):
+    # table2 每项 entry_size 字节，开头是字符串在 str1 中的偏移，length_at 处是长度（DataPack5 为 8 和 4）
+    # 用 iter_unpack 一次解析整个 table2，字符串直接从 str1 的 memoryview 解码，不切出中间的 bytes
+    table = memoryview(data)[:IdxQ * entry_size]
+    if len(table) < IdxQ * entry_size:
+        raise ValueError(f'table2 不完整，应有 {IdxQ} 项')
+    str_view = memoryview(str_data)
+    string_ = []
+    for start, end in struct.iter_unpack(f'<I{length_at - 4}xI{entry_size - length_at - 4}x', table):
+        string = str(str_view[start:start+end], encoding)
+        if '\n\n' in string:
+            print(string)
+        string_.append(string.replace('\x00', ''))
+
+    return string_
+
+
+xor_decrypt = pakfmt.xor
+
+class LzDecompressor:
+    """解压由 pakfmt.decompress 完成，保留这个类是为了兼容原来的调用方式"""
+    def __init__(self, input_data: bytes):
+        self.input_data = input_data
+
+    def decompress(self) -> bytearray:
+        return pakfmt.decompress(self.input_data)
+
+def decode_name(name: bytes, layout=pakfmt.GSWSYS) -> str:
+    """Decodes an index file name, trying the layout's encoding first, then the other formats', then latin1."""
+    encodings = [layout.name_encoding] + [other.name_encoding for other in pakfmt.LAYOUTS.values() if other is not layout]
+    for encoding in encodings:
+        try:
+            return name.decode(encoding).rstrip('\x00')
+        except UnicodeDecodeError:
+            pass
+    return name.decode('latin1').rstrip('\x00')
+
+# --- Constants ---
+
+# 封包头部、索引表和 SCW 头部的大小与字段位置见 pakfmt.py
+COMPRESSION_FLAG_AT = 0x14 # 两种格式的 SCW 头部相同
+COMPRESSED_FLAG = 0xFFFFFFFF
+
+# --- Pak Header and Index ---
+
+def read_archive_index(f, verbose: bool = False):
+    """
+    Reads the pak header and the LZ-compressed index of either format (see pakfmt.py).
+
+    Args:
+        f: Pak file opened in binary mode.
+        verbose: Print header details and progress, as extract_pak does.
+
+    Returns:
+        (layout, data_block_absolute_offset, files_info), where each files_info item has
+        'filename', 'relative_offset' and 'uncompressed_size_index'.
+
+    Raises:
+        ValueError: The header or index cannot be read, or the format is unknown.
+    """
+    layout, data_block_absolute_offset, num_files, entries = pakfmt.read_index(f)
+
+    if verbose:
+        print(f"--- Pak 主头部信息（{layout.name}）---")
+        print(f"文件数量 (0x{layout.count_at:X}): {num_files}")
+        print(f"数据块绝对偏移量 (0x{layout.data_offset_at:X}): 0x{data_block_absolute_offset:X}")
+        print("-" * 30)
+
+    # 索引表每项：文件名（null 终止）、文件在数据块中的相对偏移量、文件大小，各项位置见 pakfmt 中的布局
+    files_info = [{
+        'filename': decode_name(name, layout),
+        'relative_offset': relative_offset,
+        'uncompressed_size_index': size,
+    } for name, relative_offset, size in entries]
+    if len(files_info) < num_files:
+        print(f"警告：解析索引表时提前到达文件末尾，可能索引表损坏。已读取 {len(files_info)} 个文件信息。")
+
+    return layout, data_block_absolute_offset, files_info
+
+def read_pak_index(f, verbose: bool = False):
+    """Same as read_archive_index, without the layout: returns (data_block_absolute_offset, files_info)."""
+    return read_archive_index(f, verbose)[1:]
+
+# --- Main Extraction Logic ---
+
+# 主进程只读取索引表；每个工作进程自己打开封包，读取、解密、解压并写出分到的文件，
+# 只把要打印的消息（和要写入数据库的文本）传回主进程，主进程按索引表的顺序输出
+
+_worker = None # 工作进程中的 (封包文件, 布局, 输出目录, 编码, 是否写入数据库, 段容器的部分文件或 None)
+
+def _init_worker(pak_filepath: str, layout_key: str, output_dir: str, encoding: str, use_store: bool,
+                 use_sections: bool = False):
+    global _worker
+    # 写段容器时每个工作进程写自己的部分文件，全部完成后由主进程拼起来
+    part = None
+    if use_sections:
+        part = sections.PartWriter(os.path.join(output_dir, f'{sections.CONTAINER_NAME}.{os.getpid()}.part'))
+    _worker = (open(pak_filepath, 'rb'), pakfmt.LAYOUTS[layout_key], output_dir, encoding, use_store, part)
+
+def _close_worker():
+    global _worker
+    if _worker is not None:
+        _worker[0].close()
+        if _worker[5] is not None:
+            _worker[5].close()
+        _worker = None
+
+class _SectionFile:
+    """一段解压数据对应的文件，第一次写入时才创建，这一段没有数据就不生成文件"""
+    def __init__(self, path, stack):
+        self.path = path
+        self.stack = stack
+        self.file = None
+
+    def write(self, data):
+        if self.file is None:
+            self.file = self.stack.enter_context(open(self.path, 'wb'))
+        self.file.write(data)
+
+def route(chunk, position, targets):
+    """
+    把从 position 开始的一段解压数据分给各段，targets 为 [(起点, 终点, 写入函数)]
+    交给写入函数的是 chunk 的 memoryview 切片，不复制数据
+    """
+    view = memoryview(chunk)
+    end = position + len(view)
+    for start, stop, write in targets:
+        low, high = max(start, position), min(stop, end)
+        if low < high:
+            write(view[low - position:high - position])
+
+def joined(pieces):
+    """一段数据的各个切片：只有一片时直接用，跨过多段解压输出时才拼起来"""
+    return pieces[0] if len(pieces) == 1 else b''.join(pieces)
+
+def extract_entry(task):
+    """
+    Extracts one file in the current worker.
+
+    Args:
+        task: (filename, absolute offset, size recorded in the index).
+
+    Returns:
+        (messages, record, spans): the lines to print for this file;
+        (filename, description, strings) for the store, or None when the
+        store is not used or the script has no text; and
+        (filename, part path, {section: [offset, size]}) when writing a
+        section container (see sections.py), otherwise None.
+    """
+    f, layout, output_dir, encoding, use_store, part = _worker
+    filename, file_absolute_offset, file_uncompressed_size_index = task
+    header_size = len(layout.scw_header)
+    messages = []
+    record = None
+    spans = None
+
+    with profiler.entry(filename):
+        try:
+            with profiler.phase('read'):
+                f.seek(file_absolute_offset)
+                file_header = f.read(header_size)
+            if len(file_header) < header_size:
+                messages.append(f"警告：文件 '{filename}' 头部过小，无法读取完整的 0x{header_size:X} 字节头部。跳过。")
+                return messages, record, spans
+
+            # 文件数据块头部结构（各字段的位置见 pakfmt 中的布局）:
+            # 压缩标志 (-1 表示压缩)、压缩大小、原始大小、三个表的项数、opcode / str1 / str2 的大小、描述文本
+            values = pakfmt.parse_scw_header(layout, file_header)
+            compression_flag = struct.unpack_from('<I', file_header, COMPRESSION_FLAG_AT)[0]
+            uncompressed_size_final = values['raw_size']
+
+            is_compressed = (compression_flag == COMPRESSED_FLAG)
+
+            if is_compressed:
+                data_payload_size = values['compressed_size']
+                data_payload_offset = file_absolute_offset + header_size
+                messages.append(f"  文件 '{filename}' 是压缩的。压缩大小: {data_payload_size} 字节, 期望未压缩大小: {uncompressed_size_final} 字节。")
+            else:
+                data_payload_offset = file_absolute_offset
+                data_payload_size = file_uncompressed_size_index # For uncompressed, payload size is uncompressed size
+                messages.append(f"  文件 '{filename}' 是未压缩的。大小: {data_payload_size} 字节。")
+
+            output_filepath = os.path.join(output_dir, filename)
+            f.seek(data_payload_offset)
+            remaining = data_payload_size
+
+            if not is_compressed:
+                # 未压缩的文件按段原样复制
+                with open(output_filepath, 'wb') as outfile:
+                    while remaining > 0:
+                        with profiler.phase('read'):
+                            chunk = f.read(min(pakfmt.CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
+                        with profiler.phase('write'):
+                            outfile.write(chunk)
+                if remaining > 0:
+                    messages.append(f"警告：文件 '{filename}' 数据负载过小，期望 {data_payload_size} 字节，实际读取 {data_payload_size - remaining} 字节。可能数据损坏。")
+                messages.append(f"  已保存到 '{output_filepath}'")
+                return messages, record, spans
+
+            # 压缩的文件分段读取、解密、解压，解出的数据按位置直接写进各段的文件，
+            # 生成txt需要的 table2 和 str1 只保留切片（table2 和 str1 由译文重新生成，不需要保存）；
+            # 每次解压输出都是新的 bytearray，切片在这之后一直有效
+            if part is None:
+                os.makedirs(output_filepath, exist_ok=True)
+            else:
+                spans = (filename, part.path, {})
+                output_filepath = sections.container_path(output_dir)
+            scw_sections = pakfmt.scw_sections(layout, values)
+            table2_pieces, str1_pieces = [], []
+            decompressor = pakfmt.Decompressor()
+            written = 0
+            with contextlib.ExitStack() as stack:
+                targets = [(*scw_sections['table2'], table2_pieces.append), (*scw_sections['str1'], str1_pieces.append)]
+                for section in sections.SECTIONS:
+                    if part is None:
+                        write = _SectionFile(os.path.join(output_filepath, f'{section}.bin'), stack).write
+                    else:
+                        write = part.section(spans[2], section)
+                    targets.append((*scw_sections[section], write))
+                while remaining > 0:
+                    with profiler.phase('read'):
+                        chunk = f.read(min(pakfmt.CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    with profiler.phase('xor'):
+                        chunk = xor_decrypt(chunk, start=data_payload_size - remaining)
+                    remaining -= len(chunk)
+                    with profiler.phase('decompress'):
+                        output = decompressor.feed(chunk)
+                    with profiler.phase('write'):
+                        route(output, written, targets)
+                    written += len(output)
+            if part is not None:
+                part.flush()
+
+            if remaining > 0:
+                messages.append(f"警告：文件 '{filename}' 数据负载过小，期望 {data_payload_size} 字节，实际读取 {data_payload_size - remaining} 字节。可能数据损坏。")
+            if remaining < data_payload_size and written != uncompressed_size_final:
+                messages.append(f"警告：文件 '{filename}' 解压后大小 ({written}) 与期望大小 ({uncompressed_size_final}) 不匹配。")
+            messages.append(f"  已保存到 '{output_filepath}'")
+
+            tabel2_IdxQ = values['table2']
+            with profiler.phase('strings'):
+                string = ExtractString(joined(table2_pieces), tabel2_IdxQ, joined(str1_pieces),
+                                       layout.table_entry_size, layout.string_length_at, encoding)
+            description = values['description'].decode(encoding).replace('\x00', '')
+
+            if len(string) > 0 and use_store:
+                record = (filename, description, string)
+            elif len(string) > 0:
+                with profiler.phase('write'), open(os.path.join(output_dir, f'{filename}.txt'), 'w', encoding='utf-8') as outfile:
+                    outfile.write(f'；；{description}\n')
+                    outfile.write(f'；；{tabel2_IdxQ}\n\n')
+                    for str in string:
+                        outfile.write(f'\n■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■\n{str}')
+                        outfile.write(f'\n□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□\n{str}')
+
+        except Exception as file_e:
+            messages.append(f"错误：处理文件 '{filename}' (偏移: 0x{file_absolute_offset:X}) 时发生错误：{file_e}")
+            if spans is not None:
+                # 已经写进部分文件的段不完整，容器里记为损坏，打包时报错而不是读到截断的数据
+                spans = (filename, None, None)
+
+    return messages, record, spans
+
+def extract_pak(pak_filepath: str, output_dir: str, store_path: str = None, jobs: int = None,
+                use_sections: bool = False, encoding: str = 'cp932'):
+    """
+    Extracts files from a pak archive (GswSys PACK 2.0 or DataPack5, detected from the magic).
+
+    Args:
+        pak_filepath: Path to the input pak file.
+        output_dir: Directory to save the extracted files.
+        store_path: Optional SQLite store (see store.py). When given, script
+            text goes into the store instead of one .txt per script.
+        jobs: Worker processes for reading and decompressing (default: CPU
+            count). Profiling runs everything in this process.
+        use_sections: Put every script's table1/table3/opcode/str2 into one
+            sections.bin container (see sections.py) instead of a directory
+            of small files per script.
+        encoding: Encoding of the script text and descriptions (default: cp932).
+    """
+    if not os.path.exists(pak_filepath):
+        print(f"错误：未找到输入文件 '{pak_filepath}'")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    conn = store.open_store(store_path) if store_path else None
+
+    try:
+        with open(pak_filepath, 'rb') as f:
+            # 读取主头部，解密、解压并解析索引表
+            try:
+                with profiler.phase('index'):
+                    layout, data_block_absolute_offset, files_info = read_archive_index(f, verbose=True)
+            except ValueError as e:
+                print(f"错误：{e}")
+                return
+
+        print(f"成功解析了 {len(files_info)} 个文件信息。")
+        print("--- 提取文件数据 ---")
+
+        tasks = [(info['filename'], data_block_absolute_offset + info['relative_offset'], info['uncompressed_size_index'])
+                 for info in files_info]
+        for message in sections.remove_stale(output_dir, [task[0] for task in tasks], use_sections):
+            print(message)
+        initargs = (pak_filepath, layout.key, output_dir, encoding, conn is not None, use_sections)
+        container_entries = []
+        # 各阶段的计时只能在同一个进程里记录
+        jobs = 1 if profiler.active() else (jobs or os.cpu_count() or 1)
+
+        def report(results):
+            for i, (task, (messages, record, spans)) in enumerate(zip(tasks, results)):
+                print(f"正在处理文件 {i+1}/{len(tasks)}: '{task[0]}' (偏移: 0x{task[1]:X})")
+                for message in messages:
+                    print(message)
+                if record is not None:
+                    with profiler.phase('write'):
+                        store.write_script(conn, *record)
+                if spans is not None:
+                    filename, part_path, entry_spans = spans
+                    container_entries.append((filename, part_path if entry_spans else None, entry_spans))
+
+        if jobs == 1 or len(tasks) < 2:
+            _init_worker(*initargs)
+            try:
+                report(map(extract_entry, tasks))
+            finally:
+                _close_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor:
+                report(executor.map(extract_entry, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+        if use_sections:
+            with profiler.phase('write'):
+                sections.write_container(sections.container_path(output_dir), container_entries)
+            print(f"{len(container_entries)} 个脚本的二进制段已写入 '{sections.container_path(output_dir)}'")
+
+    except FileNotFoundError:
+        print(f"错误：未找到输入文件 '{pak_filepath}'")
+    except Exception as e:
+        print(f"发生意外错误：{e}")
+    finally:
+        if conn is not None:
+            conn.commit()
+            conn.close()
+
+
+# --- Command Line Interface ---
+
+def main():
+    global 编码
+    编码 = 'cp932'
+    parser = argparse.ArgumentParser(description="从 pak 封包文件（GswSys PACK 2.0 / DataPack5，自动识别）中提取并解压文件。")
+    parser.add_argument("input_file", help="输入 pak 文件的路径。")
+    parser.add_argument("output_dir", help="保存提取文件的输出文件夹路径。")
+    parser.add_argument("--db", help="把脚本文本写入这个 SQLite 数据库（见 store.py），不再生成txt文件。")
+    parser.add_argument("--sections", action='store_true', help="各脚本的 table1/table3/opcode/str2 写进一个 sections.bin，不再每个脚本一个目录。")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数（默认: CPU 核心数）。")
+    parser.add_argument("--profile", nargs='?', const='profile.json', help="记录每个阶段和每个文件的耗时、内存峰值，写成 JSON 报告（默认: profile.json）。")
+    parser.add_argument("--profile-top", type=int, default=10, help="性能分析中列出最慢的几个文件（默认: 10）。")
+
+    args = parser.parse_args()
+
+    input_pak_path = args.input_file
+    output_folder_path = args.output_dir
+
+    print(f"开始处理封包文件 '{input_pak_path}'...")
+    if args.profile:
+        profiler.enable()
+    extract_pak(input_pak_path, output_folder_path, args.db, args.jobs, args.sections, 编码)
+    profiler.finish(args.profile, args.profile_top)
+    print("处理完成")
+
+if __name__ == "__main__":
+    main()
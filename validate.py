@@ -0,0 +1,153 @@
+import os
+import re
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import store
+import pakfmt
+import sections
+
+# 打包前检查全部文本，一次报告所有问题，而不是在压缩到一半时遇到第一个错误就退出
+BLACK_PATTERN = re.compile(r'\s*■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■■\s*')
+WHITE_DELIMITER = '□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□□'
+NAME_MAX = pakfmt.GSWSYS.name_size # 索引表中文件名的最大字节数（默认按 PACK 2.0，DataPack5 见 pakfmt.py）
+
+def unencodable(text, 编码):
+    """text 中无法用 编码 编码的字符，按出现顺序去重"""
+    try:
+        text.encode(编码)
+        return []
+    except UnicodeEncodeError:
+        pass
+    bad = {}
+    for c in text:
+        try:
+            c.encode(编码)
+        except UnicodeEncodeError:
+            bad[c] = None
+    return list(bad)
+
+def check_texts(where, 描述文本, 文本数, texts, 编码, lines=None):
+    """
+    检查描述文本长度、文本数和每一项译文的编码，返回问题列表
+    lines 为每一项译文在txt中的行号，用于定位
+    """
+    problems = []
+    bad = unencodable(描述文本, 编码)
+    if bad:
+        problems.append(f'{where}：描述文本中有无法用 {编码} 编码的字符：{"".join(bad)}')
+    elif len(描述文本.encode(编码)) > pakfmt.DESCRIPTION_MAX:
+        problems.append(f'{where}：描述文本过长（{len(描述文本.encode(编码))} 字节，最多 {pakfmt.DESCRIPTION_MAX}）：{描述文本}')
+    if 文本数 != len(texts):
+        problems.append(f'{where}：文本数不匹配！应为{文本数} ！实则{len(texts)}！')
+    for i, text in enumerate(texts):
+        bad = unencodable(text, 编码)
+        if bad:
+            position = f'第 {lines[i]} 行' if lines else f'第 {i} 项'
+            problems.append(f'{where} {position}：无法用 {编码} 编码的字符：{"".join(bad)}')
+    return problems
+
+def check_txt(path, 编码):
+    """按 pack.py 的拆分规则检查一个txt文件，返回问题列表"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    problems = []
+    matches = list(BLACK_PATTERN.finditer(content))
+    header = content[:matches[0].start()] if matches else content
+    texts, lines = [], []
+    for n, m in enumerate(matches):
+        end = matches[n + 1].start() if n + 1 < len(matches) else len(content)
+        block = content[m.end():end]
+        line = content.count('\n', 0, m.end()) + 1
+        if WHITE_DELIMITER not in block:
+            problems.append(f'{path} 第 {line} 行：译文拆分失败！找不到白色方块')
+            continue
+        texts.append(block.split(WHITE_DELIMITER, 1)[1].strip())
+        lines.append(line)
+
+    m = store.HEADER_PATTERN.search(header)
+    if m is None:
+        problems.append(f'{path}：未发现描述文本或文本数！')
+        return problems
+    if problems:
+        # 拆分失败时文本数一定对不上，不再重复报告
+        return problems + check_texts(path, m.group(1), len(texts), texts, 编码, lines)
+    return check_texts(path, m.group(1), int(m.group(2)), texts, 编码, lines)
+
+def check_item(task):
+    """检查一个脚本（task 为 (work_dir, item, 编码) 或 (work_dir, item, 编码, 文件名最大字节数)），返回问题列表"""
+    work_dir, item, 编码, name_max = task if len(task) == 4 else (*task, NAME_MAX)
+    problems = []
+    if len(item.encode(编码, errors='replace')) > name_max:
+        problems.append(f'{item}：文件名过长（最多 {name_max} 字节）')
+    path = os.path.join(work_dir, f'{item}.txt')
+    try:
+        if os.path.exists(path):
+            problems += check_txt(path, 编码)
+        else:
+            problems += check_texts(item, item, 0, [], 编码)
+    except Exception as e:
+        problems.append(f'{path}：读取失败：{e}')
+    return problems
+
+def list_items(work_dir):
+    """与 pack.py 相同，每个子目录和段容器（见 sections.py）中的每个脚本各是一个脚本"""
+    items = {d for d in os.listdir(work_dir) if os.path.isdir(os.path.join(work_dir, d))}
+    return sorted(items.union(sections.list_names(work_dir)))
+
+def validate(work_dir, 编码, items=None, conn=None, jobs=None, name_max=NAME_MAX):
+    """
+    检查要打包的全部脚本，返回所有问题的列表，空列表表示可以打包
+    conn 为 store.py 的数据库连接时从数据库读取文本，否则并行检查txt文件
+    name_max 为输出格式索引表中文件名的最大字节数
+    """
+    if items is None:
+        items = list_items(work_dir)
+
+    if conn is not None:
+        problems = []
+        for item in items:
+            if len(item.encode(编码, errors='replace')) > name_max:
+                problems.append(f'{item}：文件名过长（最多 {name_max} 字节）')
+            result = store.read_script(conn, item)
+            if result is None:
+                problems += check_texts(item, item, 0, [], 编码)
+            else:
+                描述文本, 文本数, texts = result
+                problems += check_texts(item, 描述文本, 文本数, texts, 编码)
+        return problems
+
+    tasks = [(work_dir, item, 编码, name_max) for item in items]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        results = [check_item(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(check_item, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    return [problem for result in results for problem in result]
+
+def main():
+    parser = argparse.ArgumentParser(description="检查解包目录能否正常打包，一次列出所有问题。")
+    parser.add_argument('work_dir', help='unpack.py 的输出目录。')
+    parser.add_argument('--db', help='从这个 SQLite 数据库（见 store.py）读取文本，代替txt文件。')
+    parser.add_argument('--encoding', default='cp936', help='打包使用的编码（默认: cp936）。')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数（默认: CPU 核心数）。')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.work_dir):
+        print(f"错误: 目录不存在: {args.work_dir}")
+        sys.exit(1)
+
+    conn = store.open_store(args.db) if args.db else None
+    problems = validate(args.work_dir, args.encoding, conn=conn, jobs=args.jobs)
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f'共 {len(problems)} 个问题')
+        sys.exit(1)
+    print('检查通过')
+
+if __name__ == "__main__":
+    main()
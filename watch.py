@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import argparse
+
+import pack
+import pakfmt
+import sections
+import validate
+
+# 监视解包目录，txt 或各个 .bin 一改就重新打包
+# 每个脚本压缩好的块留在内存里，只重新压缩改动过的脚本，其余的直接拼进封包
+# 新封包先写到临时文件再替换，游戏读到的不会是写了一半的文件；替换失败（封包正被占用）时下一轮再试
+
+TEMP_SUFFIX = '.tmp'
+
+def signature(item):
+    """
+    一个脚本的 txt 和目录下各个文件的 (文件名, 修改时间, 大小)，任何一个变了都要重新打包
+    没有目录、各段在段容器（见 sections.py）里时用容器文件代替目录
+    """
+    entries = []
+    try:
+        st = os.stat(os.path.join(pack.work_dir, f'{item}.txt'))
+        entries.append(('.txt', st.st_mtime_ns, st.st_size))
+    except FileNotFoundError:
+        pass
+    item_dir = os.path.join(pack.work_dir, item)
+    if pack.分段容器 is not None and item in pack.分段容器 and not os.path.isdir(item_dir):
+        st = os.stat(pack.分段容器.path)
+        entries.append((sections.CONTAINER_NAME, st.st_mtime_ns, st.st_size))
+        return tuple(sorted(entries))
+    with os.scandir(item_dir) as it:
+        for entry in it:
+            if entry.is_file():
+                st = entry.stat()
+                entries.append((entry.name, st.st_mtime_ns, st.st_size))
+    return tuple(sorted(entries))
+
+def scan():
+    """返回 {脚本: 签名}，扫描途中被删掉的脚本直接跳过"""
+    signatures = {}
+    for item in pack.list_items():
+        try:
+            signatures[item] = signature(item)
+        except FileNotFoundError:
+            pass
+    return signatures
+
+def build(item):
+    """检查并重新打包一个脚本，有问题时打印出来并返回 None"""
+    problems = validate.check_item((pack.work_dir, item, pack.编码, pack.格式.name_size))
+    if problems:
+        for problem in problems:
+            print(problem)
+        return None
+    try:
+        return pack.pack_block_construct(item)
+    except SystemExit:
+        # pack_block_construct 遇到错误时会打印原因后直接退出
+        return None
+
+def write_archive(items, blocks):
+    """拼出完整封包，写到临时文件后替换原文件，返回是否成功"""
+    archive = pack.assemble((item, blocks[item]) for item in items if item in blocks)
+    temp_path = pack.out_pack + TEMP_SUFFIX
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(archive)
+        os.replace(temp_path, pack.out_pack)
+    except OSError as e:
+        print(f'写入 {pack.out_pack} 失败：{e}，下次再试')
+        return False
+    return True
+
+def rebuild(items, blocks):
+    """重新打包 items 中的脚本，失败的保留上一次的块；返回失败的脚本列表"""
+    failed = []
+    for item in items:
+        block = build(item)
+        if block is None:
+            failed.append(item)
+            if item in blocks:
+                print(f'{item}：保留上一次打包的内容')
+            else:
+                print(f'{item}：没有可用的内容，封包中暂时不包含这个脚本')
+            continue
+        blocks[item] = block
+    return failed
+
+def watch(interval, debounce):
+    blocks = {}
+    signatures = scan()
+
+    print(f'首次打包 {len(signatures)} 个脚本...')
+    start = time.perf_counter()
+    if os.path.exists(pack.out_pack):
+        # 已有的封包里没改过的块直接复用，不用重新压缩
+        pack.load_source(pack.out_pack)
+    try:
+        rebuild(list(signatures), blocks)
+    finally:
+        if pack.源封包文件 is not None:
+            pack.源封包文件.close()
+            pack.源封包, pack.源封包文件 = None, None
+    pending = not write_archive(list(signatures), blocks)
+    print(f'完成，用时 {time.perf_counter() - start:.2f} 秒 → {pack.out_pack}')
+    print(f'正在监视 {pack.work_dir}（Ctrl+C 停止）')
+
+    while True:
+        time.sleep(interval)
+        current = scan()
+        changed = [item for item, sig in current.items() if signatures.get(item) != sig]
+        removed = signatures.keys() - current.keys()
+        if not changed and not removed and not pending:
+            continue
+
+        # 编辑器保存时可能分几次写入，等文件不再变化再打包
+        time.sleep(debounce)
+        if scan() != current:
+            continue
+
+        start = time.perf_counter()
+        failed = rebuild(changed, blocks)
+        for item in removed:
+            blocks.pop(item, None)
+        signatures = current
+        pending = not write_archive(list(current), blocks)
+        if not pending:
+            rebuilt = [item for item in changed if item not in failed]
+            names = '、'.join(rebuilt[:5]) + ('……' if len(rebuilt) > 5 else '')
+            print(f"[{time.strftime('%H:%M:%S')}] 重新打包 {len(rebuilt)} 个脚本（{names}），失败 {len(failed)} 个，"
+                  f"删除 {len(removed)} 个，用时 {time.perf_counter() - start:.2f} 秒")
+
+if __name__ == "__main__":
+    pack.编码 = 'cp936'
+    parser = argparse.ArgumentParser(description="监视解包目录，文件一改就只重新压缩改动的脚本并更新封包。")
+    parser.add_argument("work_dir", help="unpack.py 的输出目录。")
+    parser.add_argument("out_pack", help="输出 pak 文件的路径。")
+    parser.add_argument("-f", "--format", choices=pakfmt.LAYOUTS, default='gsw', help="输出封包的格式（默认: gsw）。")
+    parser.add_argument("-l", "--level", choices=pack.LEVELS, default='fast', help="压缩级别（默认: fast，改完就能进游戏看）。")
+    parser.add_argument("--tail-merge", action='store_true', help="字符串池中是其他字符串后缀的字符串不再单独保存。")
+    parser.add_argument("--interval", type=float, default=0.5, help="检查文件的间隔，秒（默认: 0.5）。")
+    parser.add_argument("--debounce", type=float, default=0.2, help="发现改动后等文件写完的时间，秒（默认: 0.2）。")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.work_dir):
+        print(f"错误：未找到目录 '{args.work_dir}'")
+        sys.exit(1)
+    pack.work_dir = args.work_dir
+    pack.out_pack = args.out_pack
+    pack.分段容器 = sections.open_container(args.work_dir)
+    pack.格式 = pakfmt.LAYOUTS[args.format]
+    pack.压缩级别 = args.level
+    pack.尾部合并 = args.tail_merge
+    try:
+        watch(args.interval, args.debounce)
+    except KeyboardInterrupt:
+        print('已停止')